@@ -0,0 +1,316 @@
+"""JSON API (``/api/v1``) for the delivery driver app and the counter POS.
+
+Requests authenticate with ``Authorization: Bearer <API_TOKEN>`` or the
+admin session cookie. Responses are encoded with orjson when it is
+installed, straight from the database rows; the Pydantic models in
+``models`` validate request bodies and describe the responses in the
+OpenAPI schema. Lists of production, sales and orders are
+keyset-paginated (``before``/``after`` cursors as on the HTML pages) and
+every list accepts ``fields=id,date,...`` to read and return only those
+keys.
+"""
+import json
+from datetime import date
+
+import aiosqlite
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from . import writes
+from .auth import require_api_auth
+from .cache import conditional, notify_change
+from .catalog import catalog
+from .database import get_db_connection, run_write, ORDER_STATUS, PRODUCED_PRODUCTS, PRODUCT_TYPES
+from .models import (
+    CursorPage, Material, MaterialCreate, MaterialUpdate, Order, OrderItem, OrderStatusUpdate,
+    Production, ProductionCreate, ProductStock, Sale, SaleCreate,
+)
+from .orders import OrderRow, load_items, order_filters
+from .pagination import ORDERS_ORDER, PAGE_SIZE, HISTORY_ORDER, Page, history_filters, keyset_page
+from .reports import fetch_report, report_range
+
+try:
+    import orjson
+except ImportError:  # orjson opsiyonel; yoksa standart json
+    orjson = None
+
+APIResponse = ORJSONResponse if orjson is not None else JSONResponse
+
+MAX_PAGE_SIZE = 100
+
+FIELDS = Query(None, description="Comma-separated fields to return (default: all)")
+LIMIT = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+# Tabloda kolon olarak bulunmayan alanlar
+PRODUCTION_MATERIALS = """(SELECT json_group_object(pm.material_id, pm.amount) FROM production_materials pm
+                           WHERE pm.production_id = production.id) AS materials"""
+
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["api"],
+    dependencies=[Depends(require_api_auth)],
+    default_response_class=APIResponse,
+)
+
+
+def select_fields(fields: str | None, model) -> list[str]:
+    """Validated list of requested ``model`` fields; all of them if ``fields`` is empty."""
+    allowed = list(model.model_fields)
+    if not fields:
+        return allowed
+    selected = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in allowed]
+    if unknown:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+
+def columns(selected: list[str], order=(), computed: dict[str, str | None] | None = None) -> str:
+    """SELECT list for ``selected`` plus the sort columns the cursor needs.
+
+    ``computed`` maps a field to its SQL expression, or to None for fields
+    filled in afterwards (order items).
+    """
+    computed = computed or {}
+    names = dict.fromkeys([*selected, *(column for column, _ in order)])
+    return ", ".join(computed.get(name, name) for name in names if computed.get(name, name))
+
+
+def project(row, selected: list[str]) -> dict:
+    return {name: row[name] for name in selected}
+
+
+def page_response(page: Page, data: list[dict]) -> Response:
+    return APIResponse({"data": data, "next_cursor": page.next_cursor, "prev_cursor": page.prev_cursor})
+
+
+def check_product(product_type: str, products: dict):
+    if product_type not in products:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, f"Unknown product_type: {product_type}")
+
+
+# ==================== MATERIALS ====================
+
+def name_conflict(error: aiosqlite.IntegrityError) -> HTTPException:
+    """409 for a duplicate material name; any other integrity error is re-raised."""
+    if "UNIQUE" not in str(error):
+        raise error
+    return HTTPException(status.HTTP_409_CONFLICT, "A material with this name already exists")
+
+
+@router.get("/materials", response_model=list[Material])
+@conditional("materials")
+async def list_materials(request: Request, fields: str = FIELDS):
+    selected = select_fields(fields, Material)
+    async with get_db_connection() as db:
+        rows = await db.execute_fetchall(f"SELECT {columns(selected)} FROM materials ORDER BY name")
+    return APIResponse([project(row, selected) for row in rows])
+
+
+@router.post("/materials", response_model=Material, status_code=status.HTTP_201_CREATED)
+async def create_material(body: MaterialCreate):
+    try:
+        material = await run_write(lambda db: writes.save_material(db, **body.model_dump(), replace=False))
+    except aiosqlite.IntegrityError as error:
+        raise name_conflict(error)
+    notify_change("materials")
+    return APIResponse(project(material, list(Material.model_fields)), status_code=status.HTTP_201_CREATED)
+
+
+@router.patch("/materials/{material_id}", response_model=Material)
+async def update_material(material_id: int, body: MaterialUpdate):
+    values = body.model_dump(exclude_unset=True)
+    try:
+        material = await run_write(lambda db: writes.update_material(db, material_id, **values))
+    except aiosqlite.IntegrityError as error:
+        raise name_conflict(error)
+    if material is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Material not found")
+    notify_change("materials")
+    return APIResponse(project(material, list(Material.model_fields)))
+
+
+@router.delete("/materials/{material_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_material(material_id: int):
+    await run_write(lambda db: writes.delete_material(db, material_id))
+    notify_change("materials")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# ==================== PRODUCT STOCK ====================
+
+@router.get("/products", response_model=list[ProductStock])
+@conditional("product_stock")
+async def list_products(request: Request, fields: str = FIELDS):
+    selected = select_fields(fields, ProductStock)
+    snapshot = await catalog.get()
+    return APIResponse([project(product, selected) for product in snapshot.products.values()])
+
+
+# ==================== PRODUCTION ====================
+
+@router.get("/production", response_model=CursorPage[Production])
+@conditional("production")
+async def list_production(
+    request: Request,
+    before: str = Query(None),
+    after: str = Query(None),
+    limit: int = LIMIT,
+    product_type: str = Query(None),
+    start_date: date = Query(None),
+    end_date: date = Query(None),
+    fields: str = FIELDS,
+):
+    selected = select_fields(fields, Production)
+    where, params = history_filters(start_date and start_date.isoformat(), end_date and end_date.isoformat(), product_type)
+    async with get_db_connection() as db:
+        page = await keyset_page(
+            db, "production", where, params, before=before, after=after, limit=limit,
+            columns=columns(selected, HISTORY_ORDER, {"materials": PRODUCTION_MATERIALS}),
+        )
+
+    data = [project(row, selected) for row in page.rows]
+    if "materials" in selected:
+        for item in data:
+            item["materials"] = json.loads(item["materials"]) if item["materials"] else {}
+    return page_response(page, data)
+
+
+@router.post("/production", response_model=Production, status_code=status.HTTP_201_CREATED)
+async def create_production(body: ProductionCreate):
+    check_product(body.product_type, PRODUCED_PRODUCTS)
+    materials_used = {material_id: amount for material_id, amount in body.materials.items() if amount > 0}
+    production = await run_write(
+        lambda db: writes.record_production(
+            db, body.date.isoformat(), body.product_type, body.quantity, materials_used, body.notes
+        )
+    )
+    notify_change("production", "materials", "product_stock")
+    return APIResponse(
+        project(dict(production, materials=materials_used), list(Production.model_fields)),
+        status_code=status.HTTP_201_CREATED,
+    )
+
+
+@router.delete("/production/{production_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_production(production_id: int):
+    await run_write(lambda db: writes.delete_production(db, production_id))
+    notify_change("production", "materials", "product_stock")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# ==================== SALES ====================
+
+@router.get("/sales", response_model=CursorPage[Sale])
+@conditional("sales")
+async def list_sales(
+    request: Request,
+    before: str = Query(None),
+    after: str = Query(None),
+    limit: int = LIMIT,
+    product_type: str = Query(None),
+    start_date: date = Query(None),
+    end_date: date = Query(None),
+    fields: str = FIELDS,
+):
+    selected = select_fields(fields, Sale)
+    where, params = history_filters(start_date and start_date.isoformat(), end_date and end_date.isoformat(), product_type)
+    async with get_db_connection() as db:
+        page = await keyset_page(
+            db, "sales", where, params, before=before, after=after, limit=limit,
+            columns=columns(selected, HISTORY_ORDER),
+        )
+    return page_response(page, [project(row, selected) for row in page.rows])
+
+
+@router.post("/sales", response_model=Sale, status_code=status.HTTP_201_CREATED)
+async def create_sale(body: SaleCreate):
+    check_product(body.product_type, PRODUCT_TYPES)
+    sale = await run_write(
+        lambda db: writes.record_sale(
+            db, body.date.isoformat(), body.product_type, body.quantity, body.unit_price,
+            body.customer_name or None, body.notes or None,
+        )
+    )
+    notify_change("sales", "product_stock")
+    return APIResponse(project(sale, list(Sale.model_fields)), status_code=status.HTTP_201_CREATED)
+
+
+@router.delete("/sales/{sale_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_sale(sale_id: int):
+    await run_write(lambda db: writes.delete_sale(db, sale_id))
+    notify_change("sales", "product_stock")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# ==================== ORDERS ====================
+
+def order_dict(order: OrderRow, selected: list[str]) -> dict:
+    data = {name: order[name] for name in selected if name != "items"}
+    if "items" in selected:
+        data["items"] = [project(item, list(OrderItem.model_fields)) for item in order.order_items]
+    return data
+
+
+@router.get("/orders", response_model=CursorPage[Order])
+@conditional("orders")
+async def list_orders(
+    request: Request,
+    before: str = Query(None),
+    after: str = Query(None),
+    limit: int = LIMIT,
+    status: str = Query(None),
+    date_filter: str = Query("all", description="today, upcoming, all or a delivery date (YYYY-MM-DD)"),
+    fields: str = FIELDS,
+):
+    selected = select_fields(fields, Order)
+    where, params = order_filters(status, date_filter)
+    async with get_db_connection() as db:
+        page = await keyset_page(
+            db, "orders", where, params, before=before, after=after, limit=limit, order=ORDERS_ORDER,
+            columns=columns(selected, ORDERS_ORDER, {"items": None}),
+        )
+        orders = [OrderRow(row) for row in page.rows]
+        if "items" in selected:
+            await load_items(db, orders)
+    return page_response(page, [order_dict(order, selected) for order in orders])
+
+
+@router.get("/orders/{order_id}", response_model=Order)
+async def get_order(order_id: int, fields: str = FIELDS):
+    selected = select_fields(fields, Order)
+    async with get_db_connection() as db:
+        rows = await db.execute_fetchall("SELECT * FROM orders WHERE id = ?", (order_id,))
+        orders = [OrderRow(row) for row in rows]
+        await load_items(db, orders)
+    if not orders:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Order not found")
+    return APIResponse(order_dict(orders[0], selected))
+
+
+@router.post("/orders/{order_id}/status", response_model=Order)
+async def update_order_status(order_id: int, body: OrderStatusUpdate):
+    if body.status not in ORDER_STATUS:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, f"Unknown status: {body.status}")
+    order = await run_write(lambda db: writes.set_order_status(db, order_id, body.status))
+    if order is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Order not found")
+    notify_change("orders")
+    return APIResponse(order_dict(order, list(Order.model_fields)))
+
+
+# ==================== REPORTS ====================
+
+@router.get("/reports")
+@conditional("production", "sales", "materials")
+async def get_report(
+    request: Request,
+    period: str = Query("today", pattern="^(today|week|month|custom)$"),
+    start_date: date = Query(None),
+    end_date: date = Query(None),
+):
+    """Production, sales and material usage totals for the period (same data as ``/reports``)."""
+    start, end = report_range(period, start_date and start_date.isoformat(), end_date and end_date.isoformat())
+    async with get_db_connection() as db:
+        report = await fetch_report(db, start, end)
+    return APIResponse({"start_date": start.isoformat(), "end_date": end.isoformat(), **report})
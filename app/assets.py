@@ -0,0 +1,139 @@
+"""Fingerprinted static assets.
+
+At startup ``build_assets`` copies every file under ``static/`` to
+``static/dist/`` with a content hash in its name (``styles.3f2a9c1e0b.css``)
+and writes ``.gz`` / ``.br`` variants next to it. Templates link assets
+through ``asset_url("styles.css")``; since a changed file gets a new URL,
+``/static/dist/`` can be cached forever and is served by
+``PrecompressedStaticFiles`` without recompressing anything per request.
+
+Pico CSS is vendored into ``static/vendor/`` at image build time
+(``python -m app.assets vendor``); without it pages fall back to the CDN.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import shutil
+import stat
+import sys
+import urllib.request
+from pathlib import Path
+
+import anyio
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+from .compression import COMPRESSIBLE_TYPES, accepted_encodings, brotli
+
+STATIC_DIR = Path(__file__).parent / "static"
+DIST_DIR = STATIC_DIR / "dist"
+VENDOR_DIR = STATIC_DIR / "vendor"
+
+PICO_URL = os.getenv("PICO_URL", "https://cdn.jsdelivr.net/npm/@picocss/pico@2.0.6/css/pico.min.css")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Dağıtımda olmayan dosyalar için yedek adresler
+FALLBACK_URLS = {"vendor/pico.min.css": PICO_URL}
+
+logger = logging.getLogger(__name__)
+
+_manifest: dict[str, str] = {}
+
+
+def _fingerprinted(name: str, content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+
+
+def _write_variants(target: Path, content: bytes):
+    target.write_bytes(content)
+    if mimetypes.guess_type(target.name)[0] not in COMPRESSIBLE_TYPES:
+        return
+    target.with_name(target.name + ".gz").write_bytes(gzip.compress(content, 9, mtime=0))
+    if brotli is not None:
+        target.with_name(target.name + ".br").write_bytes(brotli.compress(content, quality=11))
+
+
+def build_assets() -> dict[str, str]:
+    """Fingerprint every file under ``static/`` into ``static/dist/``; return the manifest."""
+    manifest = {}
+    DIST_DIR.mkdir(exist_ok=True)
+    for source in sorted(STATIC_DIR.rglob("*")):
+        if not source.is_file() or DIST_DIR in source.parents:
+            continue
+        name = source.relative_to(STATIC_DIR).as_posix()
+        content = source.read_bytes()
+        built = _fingerprinted(name, content)
+        target = DIST_DIR / built
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            _write_variants(target, content)
+        manifest[name] = f"/static/dist/{built}"
+
+    # Eski sürümleri temizle
+    current = {url.removeprefix("/static/dist/") for url in manifest.values()}
+    for path in DIST_DIR.rglob("*"):
+        if path.is_file() and path.relative_to(DIST_DIR).as_posix().removesuffix(".gz").removesuffix(".br") not in current:
+            path.unlink()
+    for path in sorted(DIST_DIR.rglob("*"), reverse=True):
+        if path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
+
+    _manifest.clear()
+    _manifest.update(manifest)
+    logger.info("Built %d static assets", len(manifest))
+    return manifest
+
+
+def asset_url(name: str) -> str:
+    """URL of the fingerprinted ``name`` (path relative to ``static/``)."""
+    if name in _manifest:
+        return _manifest[name]
+    return FALLBACK_URLS.get(name, f"/static/{name}")
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Serves ``static/dist``: ``.br``/``.gz`` variants when accepted, cached forever."""
+
+    async def get_response(self, path: str, scope) -> FileResponse:
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                response = FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                    headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+                )
+                break
+        else:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+
+def vendor():
+    """Download Pico CSS into ``static/vendor/`` (run at image build time)."""
+    VENDOR_DIR.mkdir(exist_ok=True)
+    with urllib.request.urlopen(PICO_URL, timeout=30) as response, open(VENDOR_DIR / "pico.min.css", "wb") as out:
+        shutil.copyfileobj(response, out)
+
+
+if __name__ == "__main__":
+    # python -m app.assets vendor | build
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "vendor":
+        vendor()
+    elif command == "build":
+        print(f"{len(build_assets())} asset")
+    else:
+        sys.exit(f"Unknown command: {command}")
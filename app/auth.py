@@ -1,4 +1,7 @@
 import os
+import secrets
+import time
+from collections import OrderedDict
 from fastapi import Request, HTTPException, status
 from fastapi.responses import RedirectResponse
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
@@ -7,13 +10,54 @@ from functools import wraps
 SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "default-secret-key-change-in-production")
 AUTH_USERNAME = os.getenv("AUTH_USERNAME", "admin")
 AUTH_PASSWORD = os.getenv("AUTH_PASSWORD", "changeme")
+# JSON API için Bearer token (boşsa yalnızca oturum çerezi geçerli)
+API_TOKEN = os.getenv("API_TOKEN", "")
 
 SESSION_COOKIE_NAME = "yufka_session"
 SESSION_MAX_AGE = 60 * 60 * 24 * 7  # 7 days
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "256"))
 
 serializer = URLSafeTimedSerializer(SECRET_KEY)
 
 
+class SessionCache:
+    """Bounded LRU of verified session tokens, each kept until the token expires."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+
+    def get(self, token: str) -> dict | None:
+        entry = self._entries.get(token)
+        if entry is not None and entry[1] > time.time():
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+        if entry is not None:
+            del self._entries[token]
+        self.misses += 1
+        return None
+
+    def put(self, token: str, data: dict, expires_at: float):
+        if self.size <= 0:
+            return
+        self._entries[token] = (data, expires_at)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+session_cache = SessionCache(SESSION_CACHE_SIZE)
+
+
 def create_session_token(username: str) -> str:
     """Create a signed session token."""
     return serializer.dumps({"username": username})
@@ -21,11 +65,15 @@ def create_session_token(username: str) -> str:
 
 def verify_session_token(token: str) -> dict | None:
     """Verify and decode session token."""
-    try:
-        data = serializer.loads(token, max_age=SESSION_MAX_AGE)
+    data = session_cache.get(token)
+    if data is not None:
         return data
+    try:
+        data, signed_at = serializer.loads(token, max_age=SESSION_MAX_AGE, return_timestamp=True)
     except (BadSignature, SignatureExpired):
         return None
+    session_cache.put(token, data, signed_at.timestamp() + SESSION_MAX_AGE)
+    return data
 
 
 def verify_credentials(username: str, password: str) -> bool:
@@ -52,6 +100,21 @@ def require_auth(func):
     return wrapper
 
 
+def require_api_auth(request: Request) -> dict:
+    """Dependency for the JSON API: ``Authorization: Bearer <API_TOKEN>`` or a session cookie, else 401."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if API_TOKEN and scheme.lower() == "bearer" and secrets.compare_digest(token.strip(), API_TOKEN):
+        return {"username": "api"}
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
 def create_login_response(username: str, redirect_url: str = "/") -> RedirectResponse:
     """Create response with session cookie after successful login."""
     response = RedirectResponse(url=redirect_url, status_code=status.HTTP_302_FOUND)
@@ -68,6 +131,7 @@ def create_login_response(username: str, redirect_url: str = "/") -> RedirectRes
 
 def create_logout_response(redirect_url: str = "/login") -> RedirectResponse:
     """Create response that clears session cookie."""
+    session_cache.clear()
     response = RedirectResponse(url=redirect_url, status_code=status.HTTP_302_FOUND)
     response.delete_cookie(key=SESSION_COOKIE_NAME)
     return response
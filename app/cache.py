@@ -0,0 +1,98 @@
+"""In-process caches invalidated by the write handlers.
+
+Write handlers call ``notify_change("sales", "product_stock", ...)`` after
+their transaction commits; every cache subscribed to one of those tables
+drops its value and the table's change counter (used for ETags) grows.
+"""
+import hashlib
+import secrets
+from collections import defaultdict
+from datetime import date
+from functools import wraps
+from typing import Any, Callable
+
+from fastapi import Request
+from fastapi.responses import Response
+
+_subscribers: dict[str, list[Callable[[], None]]] = defaultdict(list)
+
+# Tablo başına değişiklik sayacı; süreç yeniden başlayınca eski ETag'ler geçersiz olsun diye BOOT_ID
+_versions: dict[str, int] = defaultdict(int)
+BOOT_ID = secrets.token_hex(4)
+
+
+def subscribe(tables, callback: Callable[[], None]):
+    """Call ``callback`` whenever one of ``tables`` changes."""
+    for table in tables:
+        _subscribers[table].append(callback)
+
+
+def notify_change(*tables: str):
+    """Invalidate every cache that depends on one of ``tables``."""
+    for table in tables:
+        _versions[table] += 1
+    callbacks = {cb for table in tables for cb in _subscribers.get(table, ())}
+    for callback in callbacks:
+        callback()
+
+
+class DayCache:
+    """Holds one value for the current day until a watched table changes.
+
+    A value computed on another day is never returned, so the cache rolls
+    over at midnight on its own. ``generation`` guards against storing a
+    value that was read while a write was committing.
+    """
+
+    def __init__(self, *tables: str):
+        self.generation = 0
+        self._day: str | None = None
+        self._value: Any = None
+        subscribe(tables, self.invalidate)
+
+    def get(self, day: str) -> Any:
+        return self._value if self._day == day else None
+
+    def set(self, day: str, value: Any, generation: int):
+        if generation == self.generation:
+            self._day = day
+            self._value = value
+
+    def invalidate(self):
+        self.generation += 1
+        self._day = None
+        self._value = None
+
+
+def data_version(tables) -> str:
+    return ".".join(str(_versions[table]) for table in tables)
+
+
+def _etag(request: Request, tables) -> str:
+    key = f"{BOOT_ID}|{date.today().isoformat()}|{data_version(tables)}|{request.url.path}?{request.url.query}"
+    return 'W/"' + hashlib.blake2b(key.encode(), digest_size=8).hexdigest() + '"'
+
+
+def conditional(*tables: str):
+    """Answer a GET with 304 while none of ``tables`` changed (and the day did not roll over).
+
+    The ETag covers the URL with its query string, so each filter
+    combination is validated separately. Put it below ``require_auth``.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(request: Request, *args, **kwargs):
+            etag = _etag(request, tables)
+            headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+            if etag in request.headers.get("if-none-match", ""):
+                return Response(status_code=304, headers=headers)
+            response = await func(request, *args, **kwargs)
+            if response.status_code == 200:
+                response.headers.update(headers)
+            return response
+        return wrapper
+    return decorator
+
+
+# Dashboard: üretim, satış ve stok tablolarına bağlı
+dashboard_cache = DayCache("production", "sales", "materials", "product_stock")
@@ -0,0 +1,61 @@
+"""In-memory product catalog (price, unit and stock of every product).
+
+``product_stock`` has a handful of rows but is read by nearly every page
+and by the public order endpoint, so it is kept in memory and reloaded
+only after a write handler calls ``notify_change("product_stock")``.
+"""
+import asyncio
+from dataclasses import dataclass
+
+from .cache import subscribe
+from .database import get_db_connection
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: int
+    products: dict[str, dict]  # product_type -> product_stock satırı
+    prices: dict[str, float]
+    units: dict[str, str]
+
+
+class Catalog:
+    """Versioned copy of ``product_stock``; ``version`` grows on every change."""
+
+    def __init__(self):
+        self.version = 0
+        self._snapshot: Snapshot | None = None
+        self._lock = asyncio.Lock()
+        subscribe(("product_stock",), self.invalidate)
+
+    def invalidate(self):
+        self.version += 1
+        self._snapshot = None
+
+    async def get(self) -> Snapshot:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        # Aynı anda gelen istekler tek sorguyu paylaşır
+        async with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+
+            version = self.version
+            async with get_db_connection() as db:
+                rows = await db.execute_fetchall("SELECT * FROM product_stock ORDER BY product_type")
+            products = {row["product_type"]: dict(row) for row in rows}
+            snapshot = Snapshot(
+                version=version,
+                products=products,
+                prices={key: row["price"] for key, row in products.items()},
+                units={key: row["unit"] for key, row in products.items()},
+            )
+            # Okuma sırasında bir yazma geldiyse sonucu saklama
+            if version == self.version:
+                self._snapshot = snapshot
+            return snapshot
+
+
+catalog = Catalog()
@@ -0,0 +1,195 @@
+"""Response compression and template whitespace minification.
+
+``CompressionMiddleware`` compresses text responses with brotli when the
+``brotli`` package is installed and the client accepts it, else with
+gzip. Small bodies, non-text content types and responses that are
+already encoded (pre-compressed static files) pass through untouched.
+Streaming responses (exports) are compressed chunk by chunk with a flush
+after each one, so they keep streaming.
+
+``HTMLMinifier`` strips indentation and blank lines from the template
+sources once, when Jinja compiles them, so rendering costs nothing extra.
+"""
+import os
+import re
+import zlib
+
+from jinja2.ext import Extension
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli opsiyonel; yoksa yalnızca gzip
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_TYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/csv",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/x-ndjson",
+    "image/svg+xml",
+}
+
+
+class _Gzip:
+    name = "gzip"
+
+    def __init__(self):
+        self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._z.compress(data) + self._z.flush()
+
+
+class _Brotli:
+    name = "br"
+
+    def __init__(self):
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Codings from an ``Accept-Encoding`` header, without the ``q=0`` ones."""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _choose(header: str):
+    accepted = accepted_encodings(header)
+    if brotli is not None and "br" in accepted:
+        return _Brotli
+    if "gzip" in accepted:
+        return _Gzip
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoder = _choose(Headers(scope=scope).get("accept-encoding", ""))
+        if encoder is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _Responder(send, encoder, self.minimum_size).send)
+
+
+class _Responder:
+    def __init__(self, send, encoder, minimum_size: int):
+        self._send = send
+        self._encoder = encoder
+        self._minimum_size = minimum_size
+        self._start = None
+        self._compressor = None
+        self._passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if self._passthrough or message["type"] != "http.response.body":
+            if self._start is not None:
+                await self._send(self._start)
+                self._start = None
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._compressor is not None:
+            data = self._compressor.chunk(body) if more_body else self._compressor.finish(body)
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        start, self._start = self._start, None
+        headers = MutableHeaders(raw=start["headers"])
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        compressible = content_type in COMPRESSIBLE_TYPES and start["status"] == 200
+        if compressible and "content-encoding" not in headers:
+            headers.add_vary_header("Accept-Encoding")
+        else:
+            compressible = False
+
+        if not compressible or (not more_body and len(body) < self._minimum_size):
+            self._passthrough = True
+            await self._send(start)
+            await self._send(message)
+            return
+
+        self._compressor = self._encoder()
+        headers["Content-Encoding"] = self._compressor.name
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # Sıkıştırılmış gövde bayt bayt aynı değil
+            headers["ETag"] = "W/" + etag
+
+        if more_body:
+            if "content-length" in headers:
+                del headers["content-length"]
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": self._compressor.chunk(body), "more_body": True})
+        else:
+            data = self._compressor.finish(body)
+            headers["Content-Length"] = str(len(data))
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": data})
+
+
+_PRESERVE_OPEN = re.compile(r"<(pre|textarea)\b", re.IGNORECASE)
+
+
+class HTMLMinifier(Extension):
+    """Drops indentation and blank lines from template sources.
+
+    Lines inside ``<pre>`` and ``<textarea>`` are left alone; everywhere
+    else a line break still separates what used to be on separate lines,
+    so inline spacing and ``//`` comments in scripts keep working.
+    """
+
+    def preprocess(self, source, name, filename=None):
+        if not name or not name.endswith(".html"):
+            return source
+        lines = []
+        preserve = None
+        for line in source.splitlines():
+            if preserve is not None:
+                lines.append(line)
+                if f"</{preserve}" in line.lower():
+                    preserve = None
+                continue
+            stripped = line.strip()
+            if stripped:
+                lines.append(stripped)
+            match = _PRESERVE_OPEN.search(stripped)
+            if match and f"</{match.group(1).lower()}" not in stripped[match.end():].lower():
+                preserve = match.group(1).lower()
+        return "\n".join(lines) + "\n"
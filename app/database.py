@@ -1,26 +1,532 @@
+import asyncio
+import logging
+import sqlite3
+import time
 import aiosqlite
 import os
 from pathlib import Path
 from contextlib import asynccontextmanager
 
+from . import migrations
+
 DATABASE_PATH = Path(__file__).parent.parent / "data" / "yufka.db"
 
+# Bağlantı havuzu ayarları
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_HEALTHCHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30"))
 
-async def get_db():
-    """Get database connection."""
-    db = await aiosqlite.connect(DATABASE_PATH)
+# Yazma kuyruğu ayarları
+DB_WRITE_RETRIES = int(os.getenv("DB_WRITE_RETRIES", "5"))
+DB_WRITE_RETRY_DELAY = float(os.getenv("DB_WRITE_RETRY_DELAY", "0.05"))
+# Grup commit: kuyrukta bekleyen işler tek transaction'da yazılır
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "64"))
+DB_WRITE_BATCH_WINDOW = float(os.getenv("DB_WRITE_BATCH_WINDOW", "0.002"))
+
+logger = logging.getLogger(__name__)
+
+
+def _choice(name: str, default: str, allowed: set[str]) -> str:
+    value = os.getenv(name, default).upper()
+    if value not in allowed:
+        raise ValueError(f"{name} must be one of {sorted(allowed)}, got {value!r}")
+    return value
+
+
+# SQLite motor profili (her bağlantıya uygulanır)
+DB_JOURNAL_MODE = _choice("DB_JOURNAL_MODE", "WAL", {"WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"})
+DB_CHECKPOINT_INTERVAL = float(os.getenv("DB_CHECKPOINT_INTERVAL", "300"))
+DB_ANALYSIS_LIMIT = int(os.getenv("DB_ANALYSIS_LIMIT", "400"))
+
+ENGINE_PROFILE = {
+    "synchronous": _choice("DB_SYNCHRONOUS", "NORMAL", {"OFF", "NORMAL", "FULL", "EXTRA"}),
+    "cache_size": int(os.getenv("DB_CACHE_SIZE", "-16000")),  # negatif değer KiB cinsinden
+    "mmap_size": int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024))),
+    "temp_store": _choice("DB_TEMP_STORE", "MEMORY", {"DEFAULT", "FILE", "MEMORY"}),
+    "busy_timeout": int(os.getenv("DB_BUSY_TIMEOUT", "5000")),
+}
+
+
+# Dosyada kalıcı olan tek mod WAL; diğerleri her bağlantıda yeniden ayarlanır
+# ve yeni bir bağlantı WAL olmayan dosyayı "delete" modunda görür
+STORED_JOURNAL_MODE = "wal" if DB_JOURNAL_MODE == "WAL" else "delete"
+
+
+async def _apply_profile(db: aiosqlite.Connection):
+    for pragma, value in ENGINE_PROFILE.items():
+        await db.execute(f"PRAGMA {pragma} = {value}")
+    if DB_JOURNAL_MODE != "WAL":
+        await db.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+
+
+async def _connect(path, read_only: bool = False) -> aiosqlite.Connection:
+    db = await aiosqlite.connect(path)
     db.row_factory = aiosqlite.Row
-    try:
+    await _apply_profile(db)
+    if read_only:
+        await db.execute("PRAGMA query_only = ON")
+    return db
+
+
+class ConnectionPool:
+    """Fixed-size pool of long-lived aiosqlite connections.
+
+    A connection that fails its health check and cannot be replaced is
+    dropped; the pool grows back to ``size`` on a later ``acquire``.
+    """
+
+    def __init__(self, path, size: int = DB_POOL_SIZE, read_only: bool = False):
+        self.path = path
+        self.size = size
+        self.read_only = read_only
+        self._idle: asyncio.Queue | None = None
+        self._open = False
+        self._connections: list[aiosqlite.Connection] = []
+        self._last_used: dict[int, float] = {}
+        self._growing = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    async def _connect(self) -> aiosqlite.Connection:
+        return await _connect(self.path, read_only=self.read_only)
+
+    async def open(self):
+        """Open all connections up front."""
+        if self.is_open:
+            return
+        os.makedirs(Path(self.path).parent, exist_ok=True)
+        idle = asyncio.Queue()
+        for _ in range(self.size):
+            db = await self._connect()
+            self._add(db)
+            idle.put_nowait(db)
+        self._idle = idle
+        self._open = True
+
+    async def close(self):
+        """Close every connection; waits for borrowed ones to come back."""
+        if not self.is_open:
+            return
+        self._open = False
+        for _ in range(len(self._connections)):
+            db = await self._idle.get()
+            await db.close()
+        self._idle = None
+        self._connections.clear()
+        self._last_used.clear()
+
+    async def _check(self, db: aiosqlite.Connection) -> aiosqlite.Connection:
+        """Health check connections that sat idle for a while; reconnect if broken."""
+        if time.monotonic() - self._last_used.get(id(db), 0) < DB_POOL_HEALTHCHECK_INTERVAL:
+            return db
+        try:
+            await db.execute("SELECT 1")
+            return db
+        except (ValueError, aiosqlite.Error):
+            pass
+
+        # Önce yenisini aç; açılamazsa bozuk bağlantı havuzdan düşer, kuyruğa dönmez
+        try:
+            fresh = await self._connect()
+        except BaseException:
+            await self._drop(db)
+            raise
+        await self._drop(db)
+        self._add(fresh)
+        return fresh
+
+    def _add(self, db: aiosqlite.Connection):
+        self._connections.append(db)
+        self._last_used[id(db)] = time.monotonic()
+
+    async def _drop(self, db: aiosqlite.Connection):
+        self._connections.remove(db)
+        self._last_used.pop(id(db), None)
+        try:
+            await db.close()
+        except (ValueError, aiosqlite.Error):
+            pass
+
+    async def _grow(self) -> aiosqlite.Connection:
+        # Düşen bağlantının yerine yenisi, ihtiyaç olduğunda açılır
+        self._growing += 1
+        try:
+            db = await self._connect()
+        finally:
+            self._growing -= 1
+        self._add(db)
+        return db
+
+    async def acquire(self) -> aiosqlite.Connection:
+        if not self.is_open:
+            raise RuntimeError("Connection pool is not open")
+        if self._idle.empty() and len(self._connections) + self._growing < self.size:
+            return await self._grow()
+        db = await asyncio.wait_for(self._idle.get(), DB_POOL_TIMEOUT)
+        try:
+            return await self._check(db)
+        except BaseException:
+            # Sağlık kontrolü yarıda kesildiyse bağlantı hâlâ havuzdadır
+            if db in self._connections:
+                self._idle.put_nowait(db)
+            raise
+
+    async def release(self, db: aiosqlite.Connection):
+        # Yarım kalmış transaction'ı havuza geri koyma
+        if db.in_transaction:
+            await db.rollback()
+        self._last_used[id(db)] = time.monotonic()
+        self._idle.put_nowait(db)
+
+    @asynccontextmanager
+    async def connection(self):
+        db = await self.acquire()
+        try:
+            yield db
+        finally:
+            await self.release(db)
+
+
+class WriterStats:
+    """Counters for the writer queue and its group commits."""
+
+    def __init__(self):
+        self.batches = 0
+        self.jobs = 0
+        self.failed_jobs = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def record(self, size: int, failed: int, seconds: float):
+        ms = seconds * 1000
+        self.batches += 1
+        self.jobs += size
+        self.failed_jobs += failed
+        self.last_batch_size = size
+        self.max_batch_size = max(self.max_batch_size, size)
+        self.last_flush_ms = ms
+        self.max_flush_ms = max(self.max_flush_ms, ms)
+        self.total_flush_ms += ms
+
+    def snapshot(self) -> dict:
+        return {
+            "batches": self.batches,
+            "jobs": self.jobs,
+            "failed_jobs": self.failed_jobs,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": round(self.jobs / self.batches, 2) if self.batches else 0,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self.total_flush_ms / self.batches, 2) if self.batches else 0,
+        }
+
+
+class DatabaseWriter:
+    """Background task that owns the only write connection.
+
+    Handlers submit ``async def fn(db)`` callables. Jobs that queue up
+    while a commit is in flight (or within ``DB_WRITE_BATCH_WINDOW``) are
+    group-committed: one ``BEGIN IMMEDIATE``/``COMMIT`` for the batch, one
+    ``SAVEPOINT`` per job so a failing job is undone without touching the
+    others. Callers get their result only after the batch has committed.
+    The whole batch is retried when another process holds the database
+    lock. If the writer task itself dies, the crash is logged and every
+    waiting caller gets an error instead of hanging.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stats = WriterStats()
+        self._db: aiosqlite.Connection | None = None
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._carry: list = []
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        if self.is_running:
+            return
+        os.makedirs(Path(self.path).parent, exist_ok=True)
+        self._db = await _connect(self.path)
+        self._queue = asyncio.Queue()
+        self._carry = []
+        self._task = asyncio.create_task(self._run(), name="db-writer")
+        self._task.add_done_callback(self._stopped)
+
+    async def stop(self):
+        """Finish every queued transaction, then close the connection."""
+        if self._task is None:
+            return
+        # Çökmüş bir yazıcının da bağlantısı kapatılır
+        if self.is_running:
+            await self._queue.put(None)
+            await self._task
+        self._task = None
+        await self._db.close()
+        self._db = None
+
+    async def submit(self, fn, transactional: bool = True):
+        """Queue a write transaction and wait for its result.
+
+        ``transactional=False`` runs ``fn`` alone, outside of BEGIN/COMMIT,
+        for statements such as ``PRAGMA wal_checkpoint`` that refuse to run
+        inside a transaction.
+        """
+        if not self.is_running:
+            raise RuntimeError("Database writer is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((fn, transactional, future))
+        return await future
+
+    def _stopped(self, task: asyncio.Task):
+        """Fail the jobs still waiting when the writer task ends."""
+        if not task.cancelled() and task.exception() is not None:
+            logger.exception("Database writer crashed", exc_info=task.exception())
+        pending = [job for job in self._carry if job is not None]
+        self._carry = []
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            if job is not None:
+                pending.append(job)
+        self._fail([future for _, _, future in pending], None if task.cancelled() else task.exception())
+
+    @staticmethod
+    def _fail(futures, cause: BaseException | None):
+        for future in futures:
+            if not future.done():
+                error = RuntimeError("Database writer stopped")
+                error.__cause__ = cause
+                future.set_exception(error)
+
+    async def _run(self):
+        carry = self._carry
+        while True:
+            job = carry.pop() if carry else await self._queue.get()
+            if job is None:
+                break
+            fn, transactional, future = job
+            if not transactional:
+                await self._run_alone(fn, future)
+                continue
+
+            batch = [job]
+            deadline = asyncio.get_running_loop().time() + DB_WRITE_BATCH_WINDOW
+            while len(batch) < DB_WRITE_BATCH_SIZE:
+                next_job = await self._next_job(deadline)
+                if next_job is False:
+                    break
+                if next_job is None or not next_job[1]:
+                    # Durdurma ya da transaction dışı iş: önce bu grubu yaz
+                    carry.append(next_job)
+                    break
+                batch.append(next_job)
+            await self._flush(batch)
+
+    async def _next_job(self, deadline: float):
+        """Next queued job, waiting until ``deadline`` at most; False if none came."""
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            return False
+        try:
+            return await asyncio.wait_for(self._queue.get(), remaining)
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run_alone(self, fn, future):
+        if future.cancelled():
+            return
+        try:
+            result = await fn(self._db)
+        except Exception as exc:
+            if not future.cancelled():
+                future.set_exception(exc)
+        except BaseException as exc:
+            self._fail([future], exc)
+            raise
+        else:
+            if not future.cancelled():
+                future.set_result(result)
+
+    async def _flush(self, batch):
+        batch = [job for job in batch if not job[2].cancelled()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            outcomes = await self._commit(batch)
+            failed = sum(1 for _, exc in outcomes if exc is not None)
+            self.stats.record(len(batch), failed, time.perf_counter() - started)
+        except BaseException as exc:
+            # İptal ya da geri alınamayan hata: bekleyen çağıranlar askıda kalmasın
+            self._fail([future for _, _, future in batch], exc)
+            raise
+
+        for (_, _, future), (result, exc) in zip(batch, outcomes):
+            if future.cancelled():
+                continue
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    async def _commit(self, batch) -> list[tuple]:
+        """Run the batch in one transaction; return ``(result, exception)`` per job."""
+        for attempt in range(DB_WRITE_RETRIES + 1):
+            try:
+                await self._db.execute("BEGIN IMMEDIATE")
+                outcomes = [await self._apply(fn) for fn, _, _ in batch]
+                await self._db.commit()
+                return outcomes
+            except sqlite3.OperationalError as exc:
+                await self._rollback()
+                if "locked" not in str(exc) or attempt == DB_WRITE_RETRIES:
+                    return [(None, exc)] * len(batch)
+                await asyncio.sleep(DB_WRITE_RETRY_DELAY * (2 ** attempt))
+            except Exception as exc:
+                # BEGIN/COMMIT hatası (DatabaseError, IntegrityError...): grup başarısız
+                await self._rollback()
+                return [(None, exc)] * len(batch)
+            except BaseException:
+                await self._rollback()
+                raise
+
+    async def _apply(self, fn):
+        """Run one job in its own savepoint; return ``(result, exception)``."""
+        await self._db.execute("SAVEPOINT job")
+        try:
+            result = await fn(self._db)
+        except Exception as exc:
+            await self._db.execute("ROLLBACK TO job")
+            await self._db.execute("RELEASE job")
+            return None, exc
+        await self._db.execute("RELEASE job")
+        return result, None
+
+    async def _rollback(self):
+        if self._db.in_transaction:
+            await self._db.rollback()
+
+    def metrics(self) -> dict:
+        return {"queue_depth": self.queue_depth, **self.stats.snapshot()}
+
+
+read_pool = ConnectionPool(DATABASE_PATH, read_only=True)
+writer = DatabaseWriter(DATABASE_PATH)
+_checkpoint_task: asyncio.Task | None = None
+
+
+async def checkpoint(mode: str = "PASSIVE"):
+    """Run a WAL checkpoint on the writer connection."""
+    async def run(db):
+        cursor = await db.execute(f"PRAGMA wal_checkpoint({mode})")
+        return await cursor.fetchone()
+
+    return await writer.submit(run, transactional=False)
+
+
+async def optimize():
+    """Refresh planner statistics (ANALYZE once, then PRAGMA optimize)."""
+    async def run(db):
+        await db.execute(f"PRAGMA analysis_limit = {DB_ANALYSIS_LIMIT}")
+        cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        if await cursor.fetchone() is None:
+            await db.execute("ANALYZE")
+        await db.execute("PRAGMA optimize")
+
+    await writer.submit(run, transactional=False)
+
+
+async def _checkpoint_loop():
+    while True:
+        await asyncio.sleep(DB_CHECKPOINT_INTERVAL)
+        try:
+            await checkpoint()
+        except Exception:
+            logger.exception("WAL checkpoint failed")
+
+
+async def open_db():
+    """Start the writer task and open the read pool (called from the app lifespan)."""
+    global _checkpoint_task
+    await writer.start()
+    await optimize()
+    await read_pool.open()
+    if DB_JOURNAL_MODE == "WAL" and DB_CHECKPOINT_INTERVAL > 0:
+        _checkpoint_task = asyncio.create_task(_checkpoint_loop(), name="db-checkpoint")
+
+
+async def close_db():
+    """Drain pending writes and close every connection (called from the app lifespan)."""
+    global _checkpoint_task
+    if _checkpoint_task is not None:
+        _checkpoint_task.cancel()
+        try:
+            await _checkpoint_task
+        except asyncio.CancelledError:
+            pass
+        _checkpoint_task = None
+    await read_pool.close()
+    await optimize()
+    if DB_JOURNAL_MODE == "WAL":
+        # Okuyucular kapandıktan sonra WAL dosyasını sıfırla
+        await checkpoint("TRUNCATE")
+    await writer.stop()
+
+
+async def run_write(fn):
+    """Run ``fn(db)`` as a single transaction on the writer connection."""
+    return await writer.submit(fn)
+
+
+async def get_db():
+    """Get a read-only database connection."""
+    async with read_pool.connection() as db:
         yield db
+
+
+async def iter_rows(db: aiosqlite.Connection, query: str, params=()):
+    """Yield the rows of ``query`` as they are read, a chunk at a time."""
+    cursor = await db.execute(query, params)
+    try:
+        while rows := await cursor.fetchmany(100):
+            for row in rows:
+                yield row
     finally:
-        await db.close()
+        await cursor.close()
 
 
 @asynccontextmanager
 async def get_db_connection():
-    """Context manager for database connection."""
-    db = await aiosqlite.connect(DATABASE_PATH)
-    db.row_factory = aiosqlite.Row
+    """Context manager for a read-only database connection."""
+    async with read_pool.connection() as db:
+        yield db
+
+
+@asynccontextmanager
+async def get_export_connection():
+    """Context manager for a read-only connection of its own, outside the pool.
+
+    For long reads paced by the client (exports), which must not hold a
+    pool slot that page requests are waiting for.
+    """
+    db = await _connect(read_pool.path, read_only=True)
     try:
         yield db
     finally:
@@ -28,170 +534,22 @@ async def get_db_connection():
 
 
 async def init_db():
-    """Initialize database tables."""
+    """Bring the database schema up to date.
+
+    When the stored schema version is current this is a single read.
+    """
     os.makedirs(DATABASE_PATH.parent, exist_ok=True)
 
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Malzemeler tablosu
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS materials (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                unit TEXT NOT NULL,
-                price REAL NOT NULL DEFAULT 0,
-                stock_quantity REAL NOT NULL DEFAULT 0,
-                min_stock_level REAL NOT NULL DEFAULT 0,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Stok hareketleri tablosu
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS stock_movements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                material_id INTEGER NOT NULL,
-                movement_type TEXT NOT NULL,
-                quantity REAL NOT NULL,
-                reference_type TEXT,
-                reference_id INTEGER,
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (material_id) REFERENCES materials(id)
-            )
-        """)
-
-        # Üretim tablosu
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS production (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date DATE NOT NULL,
-                product_type TEXT NOT NULL,
-                quantity INTEGER NOT NULL,
-                materials_used TEXT,
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Satış tablosu
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS sales (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date DATE NOT NULL,
-                product_type TEXT NOT NULL,
-                quantity INTEGER NOT NULL,
-                unit_price REAL NOT NULL,
-                total_price REAL NOT NULL,
-                customer_name TEXT,
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Ürün stokları tablosu (üretilen ve hazır alınan ürünler için)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS product_stock (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_type TEXT NOT NULL UNIQUE,
-                stock_quantity INTEGER NOT NULL DEFAULT 0,
-                min_stock_level INTEGER NOT NULL DEFAULT 0,
-                price REAL NOT NULL DEFAULT 0,
-                unit TEXT NOT NULL DEFAULT 'adet',
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Ürün stok hareketleri tablosu
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS product_stock_movements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_type TEXT NOT NULL,
-                movement_type TEXT NOT NULL,
-                quantity INTEGER NOT NULL,
-                reference_type TEXT,
-                reference_id INTEGER,
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Mevcut tabloya yeni kolonları ekle (migration)
-        try:
-            await db.execute("ALTER TABLE materials ADD COLUMN stock_quantity REAL NOT NULL DEFAULT 0")
-        except:
-            pass  # Kolon zaten var
-
-        try:
-            await db.execute("ALTER TABLE materials ADD COLUMN min_stock_level REAL NOT NULL DEFAULT 0")
-        except:
-            pass  # Kolon zaten var
-
-        # Ürün fiyatı kolonu ekle (migration)
-        try:
-            await db.execute("ALTER TABLE product_stock ADD COLUMN price REAL NOT NULL DEFAULT 0")
-        except:
-            pass  # Kolon zaten var
-
-        # Ürün birimi kolonu ekle (migration)
-        try:
-            await db.execute("ALTER TABLE product_stock ADD COLUMN unit TEXT NOT NULL DEFAULT 'adet'")
-        except:
-            pass  # Kolon zaten var
-
-        # Varsayılan malzemeleri ekle
-        default_materials = [
-            ("Un", "kg", 0),
-            ("Su", "lt", 0),
-            ("Tuz", "kg", 0),
-            ("Yağ", "lt", 0),
-        ]
-
-        for name, unit, price in default_materials:
-            await db.execute("""
-                INSERT OR IGNORE INTO materials (name, unit, price, stock_quantity, min_stock_level)
-                VALUES (?, ?, ?, 0, 0)
-            """, (name, unit, price))
-
-        # Varsayılan ürün stokları, fiyatları ve birimlerini ekle
-        default_products = [
-            ("yufka", 30, "adet"),
-            ("sigara_boregi", 100, "adet"),
-            ("manti", 300, "kg"),
-            ("kadayif", 200, "kg"),
-        ]
-        for product_type, price, unit in default_products:
-            await db.execute("""
-                INSERT OR IGNORE INTO product_stock (product_type, stock_quantity, min_stock_level, price, unit)
-                VALUES (?, 0, 0, ?, ?)
-            """, (product_type, price, unit))
-            
-            # Mevcut ürünlerin fiyatlarını ve birimlerini güncelle (eğer varsayılan değerlerde ise)
-            await db.execute("""
-                UPDATE product_stock 
-                SET price = ?, unit = ?
-                WHERE product_type = ? AND (price = 0 OR unit = 'adet')
-            """, (price, unit, product_type))
-
-        # Siparişler tablosu
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_date DATE NOT NULL,
-                delivery_date DATE NOT NULL,
-                delivery_type TEXT NOT NULL,
-                customer_name TEXT NOT NULL,
-                customer_phone TEXT NOT NULL,
-                address TEXT,
-                items TEXT NOT NULL,
-                total_amount REAL NOT NULL,
-                payment_method TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'active',
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        await db.commit()
+        version, journal_mode = await migrations.read_state(db)
+        if version >= migrations.SCHEMA_VERSION and journal_mode == STORED_JOURNAL_MODE:
+            return
+
+        # WAL dosyaya bir kez yazılır; WAL'dan çıkmak da dosyayı "delete" moduna döndürür
+        if journal_mode != STORED_JOURNAL_MODE:
+            await db.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+        await _apply_profile(db)
+        await migrations.migrate(db)
 
 
 # Stok hareket tipleri
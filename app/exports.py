@@ -0,0 +1,97 @@
+"""Streaming CSV / JSONL exports.
+
+Rows are read from the cursor in chunks and written out as they arrive,
+so memory use does not depend on the size of the export and the first
+bytes reach the client right away. A download is paced by the client and
+keeps its read snapshot open until it ends, so each export runs on a
+connection of its own (not from the read pool) and at most
+``EXPORT_CONCURRENCY`` run at once.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+from .database import get_export_connection
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "500"))
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "2"))
+EXPORT_QUEUE_TIMEOUT = float(os.getenv("EXPORT_QUEUE_TIMEOUT", "5"))
+
+_export_slots = asyncio.Semaphore(EXPORT_CONCURRENCY)
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",  # charset Starlette tarafından eklenir
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+
+async def _chunks(query: str, params):
+    """Yield the column names first, then lists of rows.
+
+    Raises TimeoutError before the first yield if no export slot frees up
+    within ``EXPORT_QUEUE_TIMEOUT`` seconds.
+    """
+    await asyncio.wait_for(_export_slots.acquire(), EXPORT_QUEUE_TIMEOUT)
+    try:
+        async with get_export_connection() as db:
+            async with db.execute(query, params) as cursor:
+                yield [column[0] for column in cursor.description]
+                while rows := await cursor.fetchmany(EXPORT_CHUNK_SIZE):
+                    yield rows
+    finally:
+        _export_slots.release()
+
+
+async def _csv(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    try:
+        # Excel'in Türkçe karakterleri doğru açması için BOM
+        buffer.write("\ufeff")
+        writer.writerow(columns)
+        async for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    finally:
+        await chunks.aclose()
+
+
+async def _jsonl(columns, chunks):
+    try:
+        async for rows in chunks:
+            yield "".join(
+                json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows
+            )
+    finally:
+        await chunks.aclose()
+
+
+async def export_response(query: str, params, filename: str, fmt: str) -> Response:
+    """Stream the result of ``query`` as a ``filename.fmt`` download."""
+    chunks = _chunks(query, params)
+    # Slot ve bağlantı yanıt başlamadan alınır: doluysa 503 dönebilelim
+    try:
+        columns = await anext(chunks)
+    except TimeoutError:
+        return PlainTextResponse(
+            "Şu anda başka dışa aktarmalar sürüyor. Lütfen biraz sonra tekrar deneyin.",
+            status_code=503,
+            headers={"Retry-After": str(max(1, round(EXPORT_QUEUE_TIMEOUT)))},
+        )
+    body = _csv(columns, chunks) if fmt == "csv" else _jsonl(columns, chunks)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{fmt}"',
+            # nginx tamponlamasın, baytlar hemen istemciye gitsin
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -1,46 +1,73 @@
 import os
 import json
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
 from pathlib import Path
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, Form, Depends, Query
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from .database import (
-    init_db, get_db_connection,
+    init_db, open_db, close_db, get_db_connection, run_write, writer, read_pool, iter_rows,
     PRODUCT_TYPES, PRODUCED_PRODUCTS, PURCHASED_PRODUCTS, MOVEMENT_TYPES,
     DELIVERY_TYPES, PAYMENT_METHODS, ORDER_STATUS, MIN_DELIVERY_AMOUNT
 )
+from . import writes
+from .cache import dashboard_cache, notify_change, conditional
+from .catalog import catalog
+from .compression import CompressionMiddleware
+from .templating import create_templates, create_stream_env, precompile, stream_template, wants_fragment, fragment_view
+from .api import router as api_router
+from .assets import PrecompressedStaticFiles, asset_url, build_assets, DIST_DIR
+from .ratelimit import rate_limit, ORDER_FORM_LIMIT, ORDER_SUBMIT_LIMIT
+from .reports import fetch_report, report_range
+from .exports import export_response
+from .pagination import history_filters, keyset_page
+from .orders import (
+    OrderListing, order_facets, order_filters, insert_items, product_demand,
+    new_form_token, clean_form_token, claim_token, save_token, order_fingerprint, TokenReused,
+)
 from .auth import (
     verify_credentials,
     get_current_user,
     require_auth,
     create_login_response,
     create_logout_response,
+    session_cache,
 )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    build_assets()
+    precompile(templates.env, stream_env)
     await init_db()
+    await open_db()
+    await catalog.get()
     yield
+    await close_db()
 
 
 app = FastAPI(title="Kadıoğlu Yufka", lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
 
 BASE_DIR = Path(__file__).parent
+DIST_DIR.mkdir(exist_ok=True)
+app.mount("/static/dist", PrecompressedStaticFiles(directory=DIST_DIR), name="dist")
 app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
-templates = Jinja2Templates(directory=BASE_DIR / "templates")
+app.include_router(api_router)
+templates = create_templates(BASE_DIR / "templates")
+# Büyük listeler (siparişler, stok hareketleri) akış halinde render edilir
+stream_env = create_stream_env(templates)
 
 templates.env.globals["PRODUCT_TYPES"] = PRODUCT_TYPES
 templates.env.globals["PRODUCED_PRODUCTS"] = PRODUCED_PRODUCTS
 templates.env.globals["PURCHASED_PRODUCTS"] = PURCHASED_PRODUCTS
+templates.env.globals["asset_url"] = asset_url
 
 
 def format_date(value, format="%d.%m.%Y"):
@@ -56,6 +83,41 @@ def format_currency(value):
 templates.env.filters["date"] = format_date
 templates.env.filters["currency"] = format_currency
 
+def fragment_or_redirect(request: Request, url: str, partial: str | None = None, **context):
+    """Form POST yanıtı: fragment isteğine yalnızca değişen parça, diğerlerine sayfaya yönlendirme.
+
+    ``partial`` verilmezse (silme) boş yanıt döner, istemci hedefi kaldırır.
+    """
+    if not wants_fragment(request):
+        return RedirectResponse(url=url, status_code=302)
+    if partial is None:
+        return HTMLResponse("")
+    return templates.TemplateResponse(f"partials/{partial}", {"request": request, **context})
+
+
+async def history_fragment(request: Request, table: str, row_id: int, url: str, partial: str, **context):
+    """Yeni üretim/satış satırı: yalnızca formun gönderildiği listede yeri varsa fragment.
+
+    Satır, sayfanın filtreleriyle ilk sayfanın en üstüne geliyorsa eklenir;
+    filtrelere uymuyorsa yanıt boştur; listede başka bir yere düşüyorsa
+    (eski tarih, sonraki sayfalar) sayfa yeniden yüklenir.
+    """
+    if not wants_fragment(request):
+        return RedirectResponse(url=url, status_code=302)
+    query, view = fragment_view(request)
+    where, params = history_filters(view.get("start_date"), view.get("end_date"), view.get("product_type"))
+    async with get_db_connection() as db:
+        listed = await db.execute_fetchall(f"SELECT 1 FROM {table}{where} AND id = ?", [*params, row_id])
+        if not listed:
+            return HTMLResponse("")
+        first = await keyset_page(db, table, where, params, limit=1, columns="id, date, created_at")
+    if view.get("before") or view.get("after") or first.rows[0]["id"] != row_id:
+        return RedirectResponse(url=f"{url}?{query}" if query else url, status_code=302)
+    return fragment_or_redirect(request, url, partial, **context)
+
+
+EXPORT_FORMAT = Query("csv", pattern="^(csv|jsonl)$")
+
 
 # ==================== AUTH ROUTES ====================
 
@@ -87,30 +149,37 @@ async def logout():
 
 @app.get("/", response_class=HTMLResponse)
 @require_auth
+@conditional("production", "sales", "materials", "product_stock")
 async def dashboard(request: Request):
     today = date.today().isoformat()
 
+    context = dashboard_cache.get(today)
+    if context is None:
+        generation = dashboard_cache.generation
+        context = await load_dashboard(today)
+        dashboard_cache.set(today, context, generation)
+
+    return templates.TemplateResponse("dashboard.html", {"request": request, **context})
+
+
+async def load_dashboard(today: str) -> dict:
     async with get_db_connection() as db:
         # Bugünkü üretim
         cursor = await db.execute(
-            "SELECT product_type, SUM(quantity) as total FROM production WHERE date = ? GROUP BY product_type",
+            "SELECT product_type, quantity as total FROM daily_production WHERE date = ?",
             (today,),
         )
         today_production = await cursor.fetchall()
 
         # Bugünkü satış
         cursor = await db.execute(
-            "SELECT product_type, SUM(quantity) as total, SUM(total_price) as revenue FROM sales WHERE date = ? GROUP BY product_type",
+            "SELECT product_type, quantity as total, revenue FROM daily_sales WHERE date = ?",
             (today,),
         )
         today_sales = await cursor.fetchall()
 
         # Toplam gelir
-        cursor = await db.execute(
-            "SELECT SUM(total_price) as total FROM sales WHERE date = ?", (today,)
-        )
-        row = await cursor.fetchone()
-        today_revenue = row["total"] if row["total"] else 0
+        today_revenue = sum(row["revenue"] for row in today_sales)
 
         # Düşük hammadde stok uyarıları
         cursor = await db.execute("""
@@ -142,53 +211,83 @@ async def dashboard(request: Request):
         """)
         recent_activities = await cursor.fetchall()
 
-    return templates.TemplateResponse(
-        "dashboard.html",
-        {
-            "request": request,
-            "today": today,
-            "today_production": today_production,
-            "today_sales": today_sales,
-            "today_revenue": today_revenue,
-            "low_stock_materials": low_stock_materials,
-            "low_stock_products": low_stock_products,
-            "recent_activities": recent_activities,
-            "product_types": PRODUCT_TYPES,
-        },
-    )
+    return {
+        "today": today,
+        "today_production": today_production,
+        "today_sales": today_sales,
+        "today_revenue": today_revenue,
+        "low_stock_materials": low_stock_materials,
+        "low_stock_products": low_stock_products,
+        "recent_activities": recent_activities,
+        "product_types": PRODUCT_TYPES,
+    }
 
 
 # ==================== PRODUCTION ====================
 
 @app.get("/production", response_class=HTMLResponse)
 @require_auth
-async def production_page(request: Request):
+async def production_page(
+    request: Request,
+    before: str = Query(None),
+    after: str = Query(None),
+    product_type: str = Query(None),
+    start_date: str = Query(None),
+    end_date: str = Query(None),
+):
+    filters = {"product_type": product_type or "", "start_date": start_date or "", "end_date": end_date or ""}
+    where, params = history_filters(start_date, end_date, product_type)
+
     async with get_db_connection() as db:
         cursor = await db.execute("SELECT * FROM materials ORDER BY name")
         materials = await cursor.fetchall()
 
-        cursor = await db.execute(
-            "SELECT * FROM production ORDER BY date DESC, created_at DESC LIMIT 20"
+        page = await keyset_page(
+            db, "production", where, params, before=before, after=after,
+            columns="""*, EXISTS (SELECT 1 FROM production_materials pm
+                                  WHERE pm.production_id = production.id) AS has_materials""",
         )
-        productions = await cursor.fetchall()
 
-        # Ürün stoklarını al
-        cursor = await db.execute("SELECT * FROM product_stock")
-        product_stocks = {row["product_type"]: row for row in await cursor.fetchall()}
+    products = await catalog.get()
 
     return templates.TemplateResponse(
         "production.html",
         {
             "request": request,
             "materials": materials,
-            "productions": productions,
+            "productions": page.rows,
             "product_types": PRODUCED_PRODUCTS,  # Sadece üretilen ürünler
-            "product_stocks": product_stocks,
+            "product_stocks": products.products,
             "today": date.today().isoformat(),
+            "filters": filters,
+            "prev_url": page.url("/production", filters, "after"),
+            "next_url": page.url("/production", filters, "before"),
         },
     )
 
 
+@app.get("/production/export")
+@require_auth
+async def export_production(
+    request: Request,
+    start_date: str = Query(None),
+    end_date: str = Query(None),
+    product_type: str = Query(None),
+    format: str = EXPORT_FORMAT,
+):
+    where, params = history_filters(start_date, end_date, product_type)
+    return await export_response(
+        """SELECT id, date, product_type, quantity,
+                  (SELECT json_group_object(pm.material_id, pm.amount) FROM production_materials pm
+                   WHERE pm.production_id = production.id) AS materials_used,
+                  notes, created_at
+           FROM production""" + where + " ORDER BY date, id",
+        params,
+        "uretim",
+        format,
+    )
+
+
 @app.post("/production")
 @require_auth
 async def add_production(request: Request):
@@ -207,107 +306,83 @@ async def add_production(request: Request):
             if amount > 0:
                 materials_used[material_id] = amount
 
-    async with get_db_connection() as db:
-        # Üretim kaydı ekle
-        cursor = await db.execute(
-            """INSERT INTO production (date, product_type, quantity, materials_used, notes)
-               VALUES (?, ?, ?, ?, ?)""",
-            (production_date, product_type, quantity, json.dumps(materials_used) if materials_used else None, notes or None),
-        )
-        production_id = cursor.lastrowid
-
-        # Hammadde stoktan düş
-        for material_id, amount in materials_used.items():
-            await db.execute(
-                "UPDATE materials SET stock_quantity = stock_quantity - ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (amount, material_id),
-            )
-            await db.execute(
-                """INSERT INTO stock_movements (material_id, movement_type, quantity, reference_type, reference_id, notes)
-                   VALUES (?, 'production', ?, 'production', ?, ?)""",
-                (material_id, -amount, production_id, f"{PRODUCT_TYPES.get(product_type, product_type)} üretimi"),
-            )
-
-        # Ürün stoğuna ekle
-        await db.execute(
-            "UPDATE product_stock SET stock_quantity = stock_quantity + ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ?",
-            (quantity, product_type),
-        )
-        await db.execute(
-            """INSERT INTO product_stock_movements (product_type, movement_type, quantity, reference_type, reference_id, notes)
-               VALUES (?, 'production', ?, 'production', ?, ?)""",
-            (product_type, quantity, production_id, "Üretim"),
-        )
-
-        await db.commit()
+    production = await run_write(
+        lambda db: writes.record_production(db, production_date, product_type, quantity, materials_used, notes or None)
+    )
+    notify_change("production", "materials", "product_stock")
 
-    return RedirectResponse(url="/production", status_code=302)
+    return await history_fragment(
+        request, "production", production["id"], "/production", "production_row.html",
+        prod=dict(production, has_materials=bool(materials_used)),
+        product_types=PRODUCED_PRODUCTS,
+    )
 
 
 @app.post("/production/{production_id}/delete")
 @require_auth
 async def delete_production(request: Request, production_id: int):
-    async with get_db_connection() as db:
-        # Üretim kaydını al
-        cursor = await db.execute("SELECT product_type, quantity, materials_used FROM production WHERE id = ?", (production_id,))
-        row = await cursor.fetchone()
-
-        if row:
-            # Hammadde stoklarını geri ekle
-            if row["materials_used"]:
-                materials_used = json.loads(row["materials_used"])
-                for material_id, amount in materials_used.items():
-                    await db.execute(
-                        "UPDATE materials SET stock_quantity = stock_quantity + ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-                        (amount, int(material_id)),
-                    )
-
-            # Ürün stoğundan düş
-            await db.execute(
-                "UPDATE product_stock SET stock_quantity = stock_quantity - ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ?",
-                (row["quantity"], row["product_type"]),
-            )
-
-        # Stok hareketlerini sil
-        await db.execute("DELETE FROM stock_movements WHERE reference_type = 'production' AND reference_id = ?", (production_id,))
-        await db.execute("DELETE FROM product_stock_movements WHERE reference_type = 'production' AND reference_id = ?", (production_id,))
+    await run_write(lambda db: writes.delete_production(db, production_id))
+    notify_change("production", "materials", "product_stock")
 
-        # Üretim kaydını sil
-        await db.execute("DELETE FROM production WHERE id = ?", (production_id,))
-        await db.commit()
-
-    return RedirectResponse(url="/production", status_code=302)
+    return fragment_or_redirect(request, "/production")
 
 
 # ==================== SALES ====================
 
 @app.get("/sales", response_class=HTMLResponse)
 @require_auth
-async def sales_page(request: Request):
+async def sales_page(
+    request: Request,
+    before: str = Query(None),
+    after: str = Query(None),
+    product_type: str = Query(None),
+    start_date: str = Query(None),
+    end_date: str = Query(None),
+):
+    filters = {"product_type": product_type or "", "start_date": start_date or "", "end_date": end_date or ""}
+    where, params = history_filters(start_date, end_date, product_type)
+
     async with get_db_connection() as db:
-        cursor = await db.execute(
-            "SELECT * FROM sales ORDER BY date DESC, created_at DESC LIMIT 20"
-        )
-        sales = await cursor.fetchall()
+        page = await keyset_page(db, "sales", where, params, before=before, after=after)
 
-        # Ürün stoklarını ve fiyatlarını al
-        cursor = await db.execute("SELECT * FROM product_stock")
-        product_stocks = {row["product_type"]: row for row in await cursor.fetchall()}
-        product_prices = {row["product_type"]: row["price"] for row in product_stocks.values()}
+    products = await catalog.get()
 
     return templates.TemplateResponse(
         "sales.html",
         {
             "request": request,
-            "sales": sales,
+            "sales": page.rows,
             "product_types": PRODUCT_TYPES,
-            "product_stocks": product_stocks,
-            "product_prices": product_prices,
+            "product_stocks": products.products,
+            "product_prices": products.prices,
+            "catalog_version": products.version,
             "today": date.today().isoformat(),
+            "filters": filters,
+            "prev_url": page.url("/sales", filters, "after"),
+            "next_url": page.url("/sales", filters, "before"),
         },
     )
 
 
+@app.get("/sales/export")
+@require_auth
+async def export_sales(
+    request: Request,
+    start_date: str = Query(None),
+    end_date: str = Query(None),
+    product_type: str = Query(None),
+    format: str = EXPORT_FORMAT,
+):
+    where, params = history_filters(start_date, end_date, product_type)
+    return await export_response(
+        """SELECT id, date, product_type, quantity, unit_price, total_price, customer_name, notes, created_at
+           FROM sales""" + where + " ORDER BY date, id",
+        params,
+        "satislar",
+        format,
+    )
+
+
 @app.post("/sales")
 @require_auth
 async def add_sale(
@@ -319,62 +394,30 @@ async def add_sale(
     customer_name: str = Form(""),
     notes: str = Form(""),
 ):
-    total_price = quantity * unit_price
-
-    async with get_db_connection() as db:
-        # Satış kaydı ekle
-        cursor = await db.execute(
-            """INSERT INTO sales (date, product_type, quantity, unit_price, total_price, customer_name, notes)
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
-            (sale_date, product_type, quantity, unit_price, total_price, customer_name or None, notes or None),
-        )
-        sale_id = cursor.lastrowid
-
-        # Ürün stoğundan düş
-        await db.execute(
-            "UPDATE product_stock SET stock_quantity = stock_quantity - ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ?",
-            (quantity, product_type),
-        )
-        await db.execute(
-            """INSERT INTO product_stock_movements (product_type, movement_type, quantity, reference_type, reference_id, notes)
-               VALUES (?, 'sale', ?, 'sale', ?, ?)""",
-            (product_type, -quantity, sale_id, customer_name or "Satış"),
-        )
-
-        await db.commit()
+    sale = await run_write(
+        lambda db: writes.record_sale(db, sale_date, product_type, quantity, unit_price, customer_name or None, notes or None)
+    )
+    notify_change("sales", "product_stock")
 
-    return RedirectResponse(url="/sales", status_code=302)
+    return await history_fragment(
+        request, "sales", sale["id"], "/sales", "sale_row.html", sale=sale, product_types=PRODUCT_TYPES
+    )
 
 
 @app.post("/sales/{sale_id}/delete")
 @require_auth
 async def delete_sale(request: Request, sale_id: int):
-    async with get_db_connection() as db:
-        # Satış kaydını al
-        cursor = await db.execute("SELECT product_type, quantity FROM sales WHERE id = ?", (sale_id,))
-        row = await cursor.fetchone()
-
-        if row:
-            # Ürün stoğuna geri ekle
-            await db.execute(
-                "UPDATE product_stock SET stock_quantity = stock_quantity + ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ?",
-                (row["quantity"], row["product_type"]),
-            )
-
-        # Stok hareketini sil
-        await db.execute("DELETE FROM product_stock_movements WHERE reference_type = 'sale' AND reference_id = ?", (sale_id,))
-
-        # Satış kaydını sil
-        await db.execute("DELETE FROM sales WHERE id = ?", (sale_id,))
-        await db.commit()
+    await run_write(lambda db: writes.delete_sale(db, sale_id))
+    notify_change("sales", "product_stock")
 
-    return RedirectResponse(url="/sales", status_code=302)
+    return fragment_or_redirect(request, "/sales")
 
 
 # ==================== MATERIALS ====================
 
 @app.get("/materials", response_class=HTMLResponse)
 @require_auth
+@conditional("materials")
 async def materials_page(request: Request):
     async with get_db_connection() as db:
         cursor = await db.execute("SELECT * FROM materials ORDER BY name")
@@ -395,13 +438,8 @@ async def add_material(
     price: float = Form(0),
     min_stock_level: float = Form(0),
 ):
-    async with get_db_connection() as db:
-        await db.execute(
-            """INSERT OR REPLACE INTO materials (name, unit, price, stock_quantity, min_stock_level, updated_at)
-               VALUES (?, ?, ?, 0, ?, CURRENT_TIMESTAMP)""",
-            (name, unit, price, min_stock_level),
-        )
-        await db.commit()
+    await run_write(lambda db: writes.save_material(db, name, unit, price, min_stock_level))
+    notify_change("materials")
 
     return RedirectResponse(url="/materials", status_code=302)
 
@@ -414,74 +452,118 @@ async def update_material(
     price: float = Form(...),
     min_stock_level: float = Form(0),
 ):
-    async with get_db_connection() as db:
-        await db.execute(
-            "UPDATE materials SET price = ?, min_stock_level = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (price, min_stock_level, material_id),
-        )
-        await db.commit()
+    material = await run_write(
+        lambda db: writes.update_material(db, material_id, price=price, min_stock_level=min_stock_level)
+    )
+    notify_change("materials")
 
-    return RedirectResponse(url="/materials", status_code=302)
+    if material is None:
+        # Malzeme bu arada silinmiş; satır da kaldırılır
+        return fragment_or_redirect(request, "/materials")
+    return fragment_or_redirect(request, "/materials", "material_row.html", material=material)
 
 
 @app.post("/materials/{material_id}/delete")
 @require_auth
 async def delete_material(request: Request, material_id: int):
-    async with get_db_connection() as db:
-        await db.execute("DELETE FROM stock_movements WHERE material_id = ?", (material_id,))
-        await db.execute("DELETE FROM materials WHERE id = ?", (material_id,))
-        await db.commit()
+    await run_write(lambda db: writes.delete_material(db, material_id))
+    notify_change("materials")
 
-    return RedirectResponse(url="/materials", status_code=302)
+    return fragment_or_redirect(request, "/materials")
 
 
 # ==================== STOCK ====================
 
+def stock_fragment(request: Request, products=(), materials=(), movements=()):
+    """Stok formlarının yanıtı: değişen stok satırı ve yeni hareket (RETURNING satırları)"""
+    ps = products[0] if products else None
+    m = materials[0] if materials else None
+    mov = movements[0] if movements else None
+    if m is not None and mov is not None:
+        mov = dict(mov, material_name=m["name"], material_unit=m["unit"])
+    return fragment_or_redirect(
+        request, "/stock", "stock_update.html",
+        oob=True, ps=ps, m=m, mov=mov,
+        product_types=PRODUCT_TYPES, movement_types=MOVEMENT_TYPES,
+    )
+
+
 @app.get("/stock", response_class=HTMLResponse)
 @require_auth
+@conditional("materials", "product_stock")
 async def stock_page(request: Request):
-    async with get_db_connection() as db:
+    products = await catalog.get()
+
+    # Bağlantı sayfa gönderilene kadar açık kalır, stream_template kapatır
+    db = await read_pool.acquire()
+    try:
         # Hammadde stokları
         cursor = await db.execute("SELECT * FROM materials ORDER BY name")
         materials = await cursor.fetchall()
+    except BaseException:
+        await read_pool.release(db)
+        raise
 
-        # Ürün stokları
-        cursor = await db.execute("SELECT * FROM product_stock ORDER BY product_type")
-        product_stocks = await cursor.fetchall()
-
-        # Hammadde hareketleri
-        cursor = await db.execute("""
-            SELECT sm.*, m.name as material_name, m.unit as material_unit
-            FROM stock_movements sm
-            JOIN materials m ON sm.material_id = m.id
-            ORDER BY sm.created_at DESC
-            LIMIT 20
-        """)
-        material_movements = await cursor.fetchall()
-
-        # Ürün stok hareketleri
-        cursor = await db.execute("""
-            SELECT * FROM product_stock_movements
-            ORDER BY created_at DESC
-            LIMIT 20
-        """)
-        product_movements = await cursor.fetchall()
-
-    return templates.TemplateResponse(
+    return stream_template(
+        stream_env,
         "stock.html",
         {
             "request": request,
             "materials": materials,
-            "product_stocks": product_stocks,
-            "material_movements": material_movements,
-            "product_movements": product_movements,
+            "product_stocks": list(products.products.values()),
+            # Hareketler şablon tablolara geldiğinde okunur
+            "product_movements": iter_rows(db, """
+                SELECT * FROM product_stock_movements
+                ORDER BY created_at DESC
+                LIMIT 20
+            """),
+            "material_movements": iter_rows(db, """
+                SELECT sm.*, m.name as material_name, m.unit as material_unit
+                FROM stock_movements sm
+                JOIN materials m ON sm.material_id = m.id
+                ORDER BY sm.created_at DESC
+                LIMIT 20
+            """),
             "movement_types": MOVEMENT_TYPES,
             "product_types": PRODUCT_TYPES,
             "purchased_products": PURCHASED_PRODUCTS,
         },
+        on_close=lambda: read_pool.release(db),
     )
 
 
+@app.get("/stock/export")
+@require_auth
+async def export_stock_movements(
+    request: Request,
+    kind: str = Query("material", pattern="^(material|product)$"),
+    start_date: str = Query(None),
+    end_date: str = Query(None),
+    format: str = EXPORT_FORMAT,
+):
+    """Hammadde veya ürün stok hareketleri"""
+    where = " WHERE 1=1"
+    params = []
+    if start_date:
+        where += " AND date(sm.created_at) >= ?"
+        params.append(start_date)
+    if end_date:
+        where += " AND date(sm.created_at) <= ?"
+        params.append(end_date)
+
+    if kind == "material":
+        query = """SELECT sm.id, sm.created_at, m.name AS material, m.unit, sm.movement_type, sm.quantity,
+                          sm.reference_type, sm.reference_id, sm.notes
+                   FROM stock_movements sm
+                   JOIN materials m ON sm.material_id = m.id""" + where + " ORDER BY sm.created_at, sm.id"
+    else:
+        query = """SELECT sm.id, sm.created_at, sm.product_type, sm.movement_type, sm.quantity,
+                          sm.reference_type, sm.reference_id, sm.notes
+                   FROM product_stock_movements sm""" + where + " ORDER BY sm.created_at, sm.id"
+
+    return await export_response(query, params, f"stok_hareketleri_{kind}", format)
+
+
 @app.post("/stock/add")
 @require_auth
 async def add_stock(
@@ -490,23 +572,25 @@ async def add_stock(
     quantity: float = Form(...),
     notes: str = Form(""),
 ):
-    async with get_db_connection() as db:
+    async def write(db):
         # Stok miktarını güncelle
-        await db.execute(
-            "UPDATE materials SET stock_quantity = stock_quantity + ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        materials = await db.execute_fetchall(
+            "UPDATE materials SET stock_quantity = stock_quantity + ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? RETURNING *",
             (quantity, material_id),
         )
 
         # Stok hareketi kaydet
-        await db.execute(
+        movements = await db.execute_fetchall(
             """INSERT INTO stock_movements (material_id, movement_type, quantity, notes)
-               VALUES (?, 'in', ?, ?)""",
+               VALUES (?, 'in', ?, ?) RETURNING *""",
             (material_id, quantity, notes or "Stok girişi"),
         )
+        return materials, movements
 
-        await db.commit()
+    materials, movements = await run_write(write)
+    notify_change("materials")
 
-    return RedirectResponse(url="/stock", status_code=302)
+    return stock_fragment(request, materials=materials, movements=movements)
 
 
 @app.post("/stock/adjust")
@@ -517,7 +601,7 @@ async def adjust_stock(
     new_quantity: float = Form(...),
     notes: str = Form(""),
 ):
-    async with get_db_connection() as db:
+    async def write(db):
         # Mevcut stok miktarını al
         cursor = await db.execute("SELECT stock_quantity FROM materials WHERE id = ?", (material_id,))
         row = await cursor.fetchone()
@@ -526,21 +610,23 @@ async def adjust_stock(
         difference = new_quantity - current_quantity
 
         # Stok miktarını güncelle
-        await db.execute(
-            "UPDATE materials SET stock_quantity = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        materials = await db.execute_fetchall(
+            "UPDATE materials SET stock_quantity = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? RETURNING *",
             (new_quantity, material_id),
         )
 
         # Stok hareketi kaydet
-        await db.execute(
+        movements = await db.execute_fetchall(
             """INSERT INTO stock_movements (material_id, movement_type, quantity, notes)
-               VALUES (?, 'adjustment', ?, ?)""",
+               VALUES (?, 'adjustment', ?, ?) RETURNING *""",
             (material_id, difference, notes or "Stok düzeltmesi"),
         )
+        return materials, movements
 
-        await db.commit()
+    materials, movements = await run_write(write)
+    notify_change("materials")
 
-    return RedirectResponse(url="/stock", status_code=302)
+    return stock_fragment(request, materials=materials, movements=movements)
 
 
 @app.post("/stock/product/add")
@@ -552,23 +638,25 @@ async def add_product_stock(
     notes: str = Form(""),
 ):
     """Hazır ürün alımı (Mantı, Kadayıf gibi)"""
-    async with get_db_connection() as db:
+    async def write(db):
         # Ürün stoğunu güncelle
-        await db.execute(
-            "UPDATE product_stock SET stock_quantity = stock_quantity + ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ?",
+        products = await db.execute_fetchall(
+            "UPDATE product_stock SET stock_quantity = stock_quantity + ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ? RETURNING *",
             (quantity, product_type),
         )
 
         # Stok hareketi kaydet
-        await db.execute(
+        movements = await db.execute_fetchall(
             """INSERT INTO product_stock_movements (product_type, movement_type, quantity, notes)
-               VALUES (?, 'in', ?, ?)""",
+               VALUES (?, 'in', ?, ?) RETURNING *""",
             (product_type, quantity, notes or "Ürün alımı"),
         )
+        return products, movements
 
-        await db.commit()
+    products, movements = await run_write(write)
+    notify_change("product_stock")
 
-    return RedirectResponse(url="/stock", status_code=302)
+    return stock_fragment(request, products=products, movements=movements)
 
 
 @app.post("/stock/product/adjust")
@@ -580,7 +668,7 @@ async def adjust_product_stock(
     notes: str = Form(""),
 ):
     """Ürün stok düzeltmesi"""
-    async with get_db_connection() as db:
+    async def write(db):
         # Mevcut stok miktarını al
         cursor = await db.execute("SELECT stock_quantity FROM product_stock WHERE product_type = ?", (product_type,))
         row = await cursor.fetchone()
@@ -589,21 +677,23 @@ async def adjust_product_stock(
         difference = new_quantity - current_quantity
 
         # Stok miktarını güncelle
-        await db.execute(
-            "UPDATE product_stock SET stock_quantity = ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ?",
+        products = await db.execute_fetchall(
+            "UPDATE product_stock SET stock_quantity = ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ? RETURNING *",
             (new_quantity, product_type),
         )
 
         # Stok hareketi kaydet
-        await db.execute(
+        movements = await db.execute_fetchall(
             """INSERT INTO product_stock_movements (product_type, movement_type, quantity, notes)
-               VALUES (?, 'adjustment', ?, ?)""",
+               VALUES (?, 'adjustment', ?, ?) RETURNING *""",
             (product_type, difference, notes or "Stok düzeltmesi"),
         )
+        return products, movements
 
-        await db.commit()
+    products, movements = await run_write(write)
+    notify_change("product_stock")
 
-    return RedirectResponse(url="/stock", status_code=302)
+    return stock_fragment(request, products=products, movements=movements)
 
 
 @app.post("/stock/product/price")
@@ -614,91 +704,33 @@ async def update_product_price(
     price: float = Form(...),
 ):
     """Ürün fiyatı güncelleme"""
-    async with get_db_connection() as db:
-        await db.execute(
-            "UPDATE product_stock SET price = ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ?",
+    async def write(db):
+        return await db.execute_fetchall(
+            "UPDATE product_stock SET price = ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ? RETURNING *",
             (price, product_type),
         )
-        await db.commit()
-    
-    return RedirectResponse(url="/stock", status_code=302)
+
+    products = await run_write(write)
+    notify_change("product_stock")
+
+    return stock_fragment(request, products=products)
 
 
 # ==================== REPORTS ====================
 
 @app.get("/reports", response_class=HTMLResponse)
 @require_auth
+@conditional("production", "sales", "materials")
 async def reports_page(
     request: Request,
     period: str = Query("today"),
     start_date: str = Query(None),
     end_date: str = Query(None),
 ):
-    today = date.today()
-
-    if period == "today":
-        start = end = today
-    elif period == "week":
-        start = today - timedelta(days=today.weekday())
-        end = today
-    elif period == "month":
-        start = today.replace(day=1)
-        end = today
-    elif period == "custom" and start_date and end_date:
-        start = date.fromisoformat(start_date)
-        end = date.fromisoformat(end_date)
-    else:
-        start = end = today
+    start, end = report_range(period, start_date, end_date)
 
     async with get_db_connection() as db:
-        # Üretim raporu
-        cursor = await db.execute(
-            """SELECT product_type, SUM(quantity) as total
-               FROM production
-               WHERE date BETWEEN ? AND ?
-               GROUP BY product_type""",
-            (start.isoformat(), end.isoformat()),
-        )
-        production_summary = await cursor.fetchall()
-
-        # Satış raporu
-        cursor = await db.execute(
-            """SELECT product_type, SUM(quantity) as total_qty, SUM(total_price) as total_revenue
-               FROM sales
-               WHERE date BETWEEN ? AND ?
-               GROUP BY product_type""",
-            (start.isoformat(), end.isoformat()),
-        )
-        sales_summary = await cursor.fetchall()
-
-        # Toplam gelir
-        cursor = await db.execute(
-            "SELECT SUM(total_price) as total FROM sales WHERE date BETWEEN ? AND ?",
-            (start.isoformat(), end.isoformat()),
-        )
-        row = await cursor.fetchone()
-        total_revenue = row["total"] if row["total"] else 0
-
-        # Günlük detay
-        cursor = await db.execute(
-            """SELECT date, SUM(quantity) as production_qty
-               FROM production
-               WHERE date BETWEEN ? AND ?
-               GROUP BY date
-               ORDER BY date DESC""",
-            (start.isoformat(), end.isoformat()),
-        )
-        daily_production = await cursor.fetchall()
-
-        cursor = await db.execute(
-            """SELECT date, SUM(quantity) as sales_qty, SUM(total_price) as revenue
-               FROM sales
-               WHERE date BETWEEN ? AND ?
-               GROUP BY date
-               ORDER BY date DESC""",
-            (start.isoformat(), end.isoformat()),
-        )
-        daily_sales = await cursor.fetchall()
+        report = await fetch_report(db, start, end)
 
     return templates.TemplateResponse(
         "reports.html",
@@ -707,44 +739,88 @@ async def reports_page(
             "period": period,
             "start_date": start.isoformat(),
             "end_date": end.isoformat(),
-            "production_summary": production_summary,
-            "sales_summary": sales_summary,
-            "total_revenue": total_revenue,
-            "daily_production": daily_production,
-            "daily_sales": daily_sales,
+            **report,
             "product_types": PRODUCT_TYPES,
         },
     )
 
 
+@app.get("/reports/export")
+@require_auth
+async def export_report(
+    request: Request,
+    period: str = Query("today"),
+    start_date: str = Query(None),
+    end_date: str = Query(None),
+    format: str = EXPORT_FORMAT,
+):
+    """Gün ve ürün bazında üretim/satış/gelir"""
+    start, end = report_range(period, start_date, end_date)
+    return await export_response(
+        """SELECT date, product_type,
+                  SUM(production_qty) AS production_qty, SUM(sales_qty) AS sales_qty, SUM(revenue) AS revenue
+           FROM (
+               SELECT date, product_type, quantity AS production_qty, 0 AS sales_qty, 0 AS revenue
+               FROM daily_production WHERE date BETWEEN :start AND :end
+               UNION ALL
+               SELECT date, product_type, 0, quantity, revenue
+               FROM daily_sales WHERE date BETWEEN :start AND :end
+           )
+           GROUP BY date, product_type
+           ORDER BY date, product_type""",
+        {"start": start.isoformat(), "end": end.isoformat()},
+        f"rapor_{start.isoformat()}_{end.isoformat()}",
+        format,
+    )
+
+
 # ==================== ORDERS ====================
 
-@app.get("/order", response_class=HTMLResponse)
-async def order_form_page(request: Request):
-    """Müşteri sipariş formu (public)"""
-    async with get_db_connection() as db:
-        # Ürün fiyatlarını ve birimlerini veritabanından al
-        cursor = await db.execute("SELECT product_type, price, unit FROM product_stock")
-        rows = await cursor.fetchall()
-        product_prices = {row["product_type"]: row["price"] for row in rows}
-        product_units = {row["product_type"]: row["unit"] for row in rows}
-    
+def render_order_form(request: Request, products, status_code: int = 200, **context):
+    """Sipariş formu; fiyat ve birimler katalogdan gelir"""
     return templates.TemplateResponse(
         "order_form.html",
         {
             "request": request,
             "product_types": PRODUCT_TYPES,
-            "product_prices": product_prices,
-            "product_units": product_units,
+            "product_prices": products.prices,
+            "product_units": products.units,
             "delivery_types": DELIVERY_TYPES,
             "payment_methods": PAYMENT_METHODS,
             "min_delivery_amount": MIN_DELIVERY_AMOUNT,
             "today": date.today().isoformat(),
+            "catalog_version": products.version,
+            **context,
         },
+        status_code=status_code,
     )
 
 
+_cached_order_form: dict[tuple[int, str], bytes] = {}
+
+
+async def cached_order_form(request: Request):
+    """Token'sız, katalog sürümü başına bir kez render edilen sipariş formu; token tarayıcıda üretilir"""
+    products = await catalog.get()
+    key = (products.version, date.today().isoformat())
+    body = _cached_order_form.get(key)
+    if body is None:
+        body = render_order_form(request, products).body
+        _cached_order_form.clear()
+        _cached_order_form[key] = body
+    return HTMLResponse(body)
+
+
+@app.get("/order", response_class=HTMLResponse)
+@rate_limit(ORDER_FORM_LIMIT)
+@conditional("product_stock")
+async def order_form_page(request: Request):
+    """Müşteri sipariş formu (public)"""
+    return await cached_order_form(request)
+
+
 @app.post("/order")
+@rate_limit(ORDER_SUBMIT_LIMIT)
 async def submit_order(request: Request):
     """Sipariş gönderme (public)"""
     form = await request.form()
@@ -756,24 +832,22 @@ async def submit_order(request: Request):
     address = form.get("address", "")
     payment_method = form.get("payment_method")
     notes = form.get("notes", "")
-    
+    # Çift tıklamada aynı token tekrar gelir, ilk siparişin numarası döner
+    form_token = clean_form_token(form.get("form_token")) or new_form_token()
     
     # Ürünleri topla
     items = []
     total_amount = 0
     
-    # Ürün fiyatlarını veritabanından al
-    async with get_db_connection() as db:
-        cursor = await db.execute("SELECT product_type, price FROM product_stock")
-        rows = await cursor.fetchall()
-        product_prices = {row["product_type"]: row["price"] for row in rows}
+    # Ürün fiyatları katalogdan; veritabanına yalnızca INSERT gider
+    products = await catalog.get()
     
     for key, value in form.items():
         if key.startswith("product_") and value:
             product_type = key.replace("product_", "")
             quantity = int(value)
             if quantity > 0:
-                unit_price = product_prices.get(product_type, 50)
+                unit_price = products.prices.get(product_type, 50)
                 item_total = quantity * unit_price
                 items.append({
                     "product_type": product_type,
@@ -785,52 +859,35 @@ async def submit_order(request: Request):
     
     # Eve teslimat için minimum tutar kontrolü
     if delivery_type == "eve_gelsin" and total_amount < MIN_DELIVERY_AMOUNT:
-        async with get_db_connection() as db:
-            cursor = await db.execute("SELECT product_type, price, unit FROM product_stock")
-            rows = await cursor.fetchall()
-            product_prices = {row["product_type"]: row["price"] for row in rows}
-            product_units = {row["product_type"]: row["unit"] for row in rows}
-        
-        return templates.TemplateResponse(
-            "order_form.html",
-            {
-                "request": request,
-                "error": f"Eve teslimat için minimum sipariş tutarı {MIN_DELIVERY_AMOUNT} TL olmalıdır.",
-                "product_types": PRODUCT_TYPES,
-                "product_prices": product_prices,
-                "product_units": product_units,
-                "delivery_types": DELIVERY_TYPES,
-                "payment_methods": PAYMENT_METHODS,
-                "min_delivery_amount": MIN_DELIVERY_AMOUNT,
-                "today": date.today().isoformat(),
-            },
+        return render_order_form(
+            request,
+            products,
             status_code=400,
+            form_token=form_token,
+            error=f"Eve teslimat için minimum sipariş tutarı {MIN_DELIVERY_AMOUNT} TL olmalıdır.",
         )
     
     if not items:
-        async with get_db_connection() as db:
-            cursor = await db.execute("SELECT product_type, price, unit FROM product_stock")
-            rows = await cursor.fetchall()
-            product_prices = {row["product_type"]: row["price"] for row in rows}
-            product_units = {row["product_type"]: row["unit"] for row in rows}
-        
-        return templates.TemplateResponse(
-            "order_form.html",
-            {
-                "request": request,
-                "error": "Lütfen en az bir ürün seçin.",
-                "product_types": PRODUCT_TYPES,
-                "product_prices": product_prices,
-                "product_units": product_units,
-                "delivery_types": DELIVERY_TYPES,
-                "payment_methods": PAYMENT_METHODS,
-                "min_delivery_amount": MIN_DELIVERY_AMOUNT,
-                "today": date.today().isoformat(),
-            },
-            status_code=400,
+        return render_order_form(
+            request, products, status_code=400, form_token=form_token, error="Lütfen en az bir ürün seçin."
         )
     
-    async with get_db_connection() as db:
+    fingerprint = order_fingerprint(
+        delivery_date=delivery_date,
+        delivery_type=delivery_type,
+        customer_name=customer_name,
+        customer_phone=customer_phone,
+        address=address,
+        payment_method=payment_method,
+        notes=notes,
+        items=[(item["product_type"], item["quantity"]) for item in items],
+    )
+
+    async def write(db):
+        existing_id = await claim_token(db, form_token, fingerprint)
+        if existing_id is not None:
+            return existing_id, False
+
         cursor = await db.execute(
             """INSERT INTO orders (order_date, delivery_date, delivery_type, customer_name, customer_phone, 
                                    address, items, total_amount, payment_method, notes)
@@ -849,87 +906,96 @@ async def submit_order(request: Request):
             ),
         )
         order_id = cursor.lastrowid
-        await db.commit()
-    
-    # Ürün fiyatlarını ve birimlerini tekrar al (template için)
-    async with get_db_connection() as db:
-        cursor = await db.execute("SELECT product_type, price, unit FROM product_stock")
-        rows = await cursor.fetchall()
-        product_prices = {row["product_type"]: row["price"] for row in rows}
-        product_units = {row["product_type"]: row["unit"] for row in rows}
+        await insert_items(db, order_id, items)
+        await save_token(db, form_token, order_id, fingerprint)
+        return order_id, True
+
+    try:
+        order_id, created = await run_write(write)
+    except TokenReused:
+        # Geri dönülüp değiştirilen form: eski siparişi döndürmek yerine yeni token ile tekrar gönderilsin
+        return render_order_form(
+            request,
+            products,
+            status_code=409,
+            form_token=new_form_token(),
+            form_data=form,
+            error="Bu form daha önce farklı bilgilerle gönderildi. Lütfen ürünleri kontrol edip tekrar gönderin.",
+        )
+    if created:
+        notify_change("orders")
     
-    return templates.TemplateResponse(
-        "order_form.html",
-        {
-            "request": request,
-            "success": True,
-            "order_id": order_id,
-            "product_types": PRODUCT_TYPES,
-            "product_prices": product_prices,
-            "product_units": product_units,
-            "delivery_types": DELIVERY_TYPES,
-            "payment_methods": PAYMENT_METHODS,
-            "min_delivery_amount": MIN_DELIVERY_AMOUNT,
-            "today": date.today().isoformat(),
-        },
-    )
+    return render_order_form(request, products, success=True, order_id=order_id)
 
 
 @app.get("/orders", response_class=HTMLResponse)
 @require_auth
+@conditional("orders", "product_stock")
 async def orders_page(
     request: Request,
     status: str = Query(None),
     date_filter: str = Query("all"),
+    before: str = Query(None),
+    after: str = Query(None),
 ):
     """Admin sipariş yönetimi"""
-    async with get_db_connection() as db:
-        query = "SELECT * FROM orders WHERE 1=1"
-        params = []
-        
-        if status:
-            query += " AND status = ?"
-            params.append(status)
-        
-        if date_filter == "today":
-            query += " AND delivery_date = ?"
-            params.append(date.today().isoformat())
-        elif date_filter == "upcoming":
-            query += " AND delivery_date >= ?"
-            params.append(date.today().isoformat())
-        
-        query += " ORDER BY delivery_date ASC, created_at DESC"
-        
-        cursor = await db.execute(query, params)
-        orders = await cursor.fetchall()
-        
-        # JSON items'ı parse et
-        orders_list = []
-        for order in orders:
-            order_dict = dict(order)
-            # items key'i dict.items() ile çakışıyor, order_items olarak değiştir
-            order_dict["order_items"] = json.loads(order["items"])
-            del order_dict["items"]  # Eski items'ı sil
-            orders_list.append(order_dict)
-        
-        # Ürün birimlerini al
-        cursor = await db.execute("SELECT product_type, unit FROM product_stock")
-        rows = await cursor.fetchall()
-        product_units = {row["product_type"]: row["unit"] for row in rows}
-    
-    return templates.TemplateResponse(
+    filters = {"status": status or "", "date_filter": date_filter}
+
+    products = await catalog.get()
+
+    # Bağlantı sayfa gönderilene kadar açık kalır, stream_template kapatır
+    db = await read_pool.acquire()
+    try:
+        facets = await order_facets(db, date.today().isoformat(), status)
+
+        # Seçili (ya da bugünkü) teslimat günü için ürün ihtiyacı
+        demand_date = date_filter if date_filter in facets["days"] else date.today().isoformat()
+        demand = await product_demand(db, demand_date)
+    except BaseException:
+        await read_pool.release(db)
+        raise
+
+    # Sipariş sayfası ve kalemleri, şablon listeye geldiğinde okunur
+    where, params = order_filters(status, date_filter)
+    orders = OrderListing(db, where, params, before, after, filters)
+
+    return stream_template(
+        stream_env,
         "orders.html",
         {
             "request": request,
-            "orders": orders_list,
+            "orders": orders,
+            "facets": facets,
+            "demand": demand,
+            "demand_date": demand_date,
             "product_types": PRODUCT_TYPES,
-            "product_units": product_units,
+            "product_units": products.units,
             "delivery_types": DELIVERY_TYPES,
             "payment_methods": PAYMENT_METHODS,
             "order_status": ORDER_STATUS,
             "current_status": status,
             "date_filter": date_filter,
         },
+        on_close=lambda: read_pool.release(db),
+    )
+
+
+@app.get("/orders/export")
+@require_auth
+async def export_orders(
+    request: Request,
+    status: str = Query(None),
+    date_filter: str = Query("all"),
+    format: str = EXPORT_FORMAT,
+):
+    where, params = order_filters(status, date_filter)
+    return await export_response(
+        """SELECT id, order_date, delivery_date, delivery_type, customer_name, customer_phone, address,
+                  items, total_amount, payment_method, status, notes, created_at
+           FROM orders""" + where + " ORDER BY delivery_date, id",
+        params,
+        "siparisler",
+        format,
     )
 
 
@@ -941,22 +1007,39 @@ async def update_order_status(
     status: str = Form(...),
 ):
     """Sipariş durumu güncelleme"""
-    async with get_db_connection() as db:
-        await db.execute(
-            "UPDATE orders SET status = ? WHERE id = ?",
-            (status, order_id),
-        )
-        await db.commit()
-    
-    return RedirectResponse(url="/orders", status_code=302)
+    order = await run_write(lambda db: writes.set_order_status(db, order_id, status))
+    notify_change("orders")
+
+    if order is None:
+        return fragment_or_redirect(request, "/orders")
+    # Durum filtresine artık uymayan kart listeden kalkar (boş yanıt hedefi siler)
+    if wants_fragment(request) and fragment_view(request)[1].get("status") not in (None, "", order["status"]):
+        return HTMLResponse("")
+    return fragment_or_redirect(
+        request, "/orders", "order_card.html",
+        order=order,
+        product_types=PRODUCT_TYPES,
+        product_units=(await catalog.get()).units,
+        delivery_types=DELIVERY_TYPES,
+        payment_methods=PAYMENT_METHODS,
+        order_status=ORDER_STATUS,
+    )
 
 
 @app.post("/orders/{order_id}/delete")
 @require_auth
 async def delete_order(request: Request, order_id: int):
     """Sipariş silme"""
-    async with get_db_connection() as db:
-        await db.execute("DELETE FROM orders WHERE id = ?", (order_id,))
-        await db.commit()
-    
-    return RedirectResponse(url="/orders", status_code=302)
+    await run_write(lambda db: writes.delete_order(db, order_id))
+    notify_change("orders")
+
+    return fragment_or_redirect(request, "/orders")
+
+
+# ==================== METRICS ====================
+
+@app.get("/metrics")
+@require_auth
+async def metrics(request: Request):
+    """Yazma kuyruğu, grup commit ve oturum önbelleği istatistikleri"""
+    return JSONResponse({"writer": writer.metrics(), "sessions": session_cache.stats()})
@@ -0,0 +1,346 @@
+"""Versioned schema migrations.
+
+Each step runs once, in order, inside its own ``BEGIN IMMEDIATE``
+transaction and records its number in ``schema_version``. Steps must be
+idempotent so that databases created before versioning existed can be
+upgraded in place.
+"""
+import aiosqlite
+
+from . import rollups
+
+
+async def read_state(db: aiosqlite.Connection) -> tuple[int, str | None]:
+    """Return (schema version, journal mode) with a single query."""
+    try:
+        cursor = await db.execute(
+            "SELECT MAX(version), (SELECT journal_mode FROM pragma_journal_mode) FROM schema_version"
+        )
+    except aiosqlite.OperationalError:
+        return 0, None
+    version, journal_mode = await cursor.fetchone()
+    return version or 0, journal_mode
+
+
+async def _current_version(db: aiosqlite.Connection) -> int:
+    cursor = await db.execute("SELECT MAX(version) FROM schema_version")
+    row = await cursor.fetchone()
+    return row[0] or 0
+
+
+async def _add_column(db: aiosqlite.Connection, table: str, column: str, definition: str):
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in await cursor.fetchall()}:
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+async def migrate(db: aiosqlite.Connection):
+    """Apply every pending migration step."""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await db.commit()
+
+    for version, step in MIGRATIONS:
+        # Birden fazla worker aynı anda açılırsa sürümü kilit altında tekrar kontrol et
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            if version > await _current_version(db):
+                await step(db)
+                await db.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+
+
+async def _base_schema(db: aiosqlite.Connection):
+    # Malzemeler tablosu
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS materials (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            unit TEXT NOT NULL,
+            price REAL NOT NULL DEFAULT 0,
+            stock_quantity REAL NOT NULL DEFAULT 0,
+            min_stock_level REAL NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Stok hareketleri tablosu
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            material_id INTEGER NOT NULL,
+            movement_type TEXT NOT NULL,
+            quantity REAL NOT NULL,
+            reference_type TEXT,
+            reference_id INTEGER,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (material_id) REFERENCES materials(id)
+        )
+    """)
+
+    # Üretim tablosu
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS production (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date DATE NOT NULL,
+            product_type TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            materials_used TEXT,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Satış tablosu
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date DATE NOT NULL,
+            product_type TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price REAL NOT NULL,
+            total_price REAL NOT NULL,
+            customer_name TEXT,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Ürün stokları tablosu (üretilen ve hazır alınan ürünler için)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS product_stock (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_type TEXT NOT NULL UNIQUE,
+            stock_quantity INTEGER NOT NULL DEFAULT 0,
+            min_stock_level INTEGER NOT NULL DEFAULT 0,
+            price REAL NOT NULL DEFAULT 0,
+            unit TEXT NOT NULL DEFAULT 'adet',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Ürün stok hareketleri tablosu
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS product_stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_type TEXT NOT NULL,
+            movement_type TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            reference_type TEXT,
+            reference_id INTEGER,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Eski kurulumlarda eksik olabilecek kolonlar
+    await _add_column(db, "materials", "stock_quantity", "REAL NOT NULL DEFAULT 0")
+    await _add_column(db, "materials", "min_stock_level", "REAL NOT NULL DEFAULT 0")
+    await _add_column(db, "product_stock", "price", "REAL NOT NULL DEFAULT 0")
+    await _add_column(db, "product_stock", "unit", "TEXT NOT NULL DEFAULT 'adet'")
+
+    # Varsayılan malzemeleri ekle
+    default_materials = [
+        ("Un", "kg", 0),
+        ("Su", "lt", 0),
+        ("Tuz", "kg", 0),
+        ("Yağ", "lt", 0),
+    ]
+
+    for name, unit, price in default_materials:
+        await db.execute("""
+            INSERT OR IGNORE INTO materials (name, unit, price, stock_quantity, min_stock_level)
+            VALUES (?, ?, ?, 0, 0)
+        """, (name, unit, price))
+
+    # Varsayılan ürün stokları, fiyatları ve birimlerini ekle
+    default_products = [
+        ("yufka", 30, "adet"),
+        ("sigara_boregi", 100, "adet"),
+        ("manti", 300, "kg"),
+        ("kadayif", 200, "kg"),
+    ]
+    for product_type, price, unit in default_products:
+        await db.execute("""
+            INSERT OR IGNORE INTO product_stock (product_type, stock_quantity, min_stock_level, price, unit)
+            VALUES (?, 0, 0, ?, ?)
+        """, (product_type, price, unit))
+
+        # Mevcut ürünlerin fiyatlarını ve birimlerini güncelle (eğer varsayılan değerlerde ise)
+        await db.execute(
+            "UPDATE product_stock SET price = ? WHERE product_type = ? AND price = 0",
+            (price, product_type),
+        )
+        await db.execute(
+            "UPDATE product_stock SET unit = ? WHERE product_type = ? AND unit = 'adet'",
+            (unit, product_type),
+        )
+
+    # Siparişler tablosu
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_date DATE NOT NULL,
+            delivery_date DATE NOT NULL,
+            delivery_type TEXT NOT NULL,
+            customer_name TEXT NOT NULL,
+            customer_phone TEXT NOT NULL,
+            address TEXT,
+            items TEXT NOT NULL,
+            total_amount REAL NOT NULL,
+            payment_method TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'active',
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+async def _indexes(db: aiosqlite.Connection):
+    # İndeksler (main.py'deki sorgu şekillerine göre)
+    for statement in INDEXES:
+        await db.execute(statement)
+
+
+async def _daily_rollups(db: aiosqlite.Connection):
+    # Günlük üretim/satış özet tabloları, mevcut kayıtlardan doldurulur
+    await rollups.create_tables(db)
+    await rollups.rebuild(db)
+
+
+async def _history_indexes(db: aiosqlite.Connection):
+    # Ürün filtreli keyset sayfalama: (product_type, date, created_at, id)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_production_product_date ON production(product_type, date, created_at)"
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sales_product_date ON sales(product_type, date, created_at)"
+    )
+
+
+async def _orders_keyset_indexes(db: aiosqlite.Connection):
+    # Sipariş listesi: ORDER BY delivery_date ASC, id DESC (keyset sayfalama)
+    await db.execute("DROP INDEX IF EXISTS idx_orders_delivery")
+    await db.execute("DROP INDEX IF EXISTS idx_orders_status_delivery")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_orders_delivery_id ON orders(delivery_date, id DESC)")
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_orders_status_delivery_id ON orders(status, delivery_date, id DESC)"
+    )
+
+
+async def _order_items(db: aiosqlite.Connection):
+    # Sipariş kalemleri: orders.items JSON'unun ilişkisel karşılığı
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_type TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price REAL NOT NULL,
+            total REAL NOT NULL,
+            FOREIGN KEY (order_id) REFERENCES orders(id)
+        )
+    """)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id, product_type, quantity)"
+    )
+
+    # Mevcut siparişlerin JSON kalemlerini taşı
+    await db.execute("""
+        INSERT INTO order_items (order_id, product_type, quantity, unit_price, total)
+        SELECT o.id,
+               json_extract(item.value, '$.product_type'),
+               json_extract(item.value, '$.quantity'),
+               json_extract(item.value, '$.unit_price'),
+               json_extract(item.value, '$.total')
+        FROM orders o, json_each(o.items) AS item
+        WHERE NOT EXISTS (SELECT 1 FROM order_items oi WHERE oi.order_id = o.id)
+        ORDER BY o.id, item.key
+    """)
+
+
+async def _production_materials(db: aiosqlite.Connection):
+    # Üretimde kullanılan malzemeler: production.materials_used JSON'unun ilişkisel karşılığı
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS production_materials (
+            production_id INTEGER NOT NULL,
+            material_id INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            PRIMARY KEY (production_id, material_id),
+            FOREIGN KEY (production_id) REFERENCES production(id),
+            FOREIGN KEY (material_id) REFERENCES materials(id)
+        ) WITHOUT ROWID
+    """)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_production_materials_material ON production_materials(material_id, amount)"
+    )
+
+    # Mevcut üretimlerin JSON malzemelerini taşı
+    await db.execute("""
+        INSERT OR IGNORE INTO production_materials (production_id, material_id, amount)
+        SELECT p.id, CAST(used.key AS INTEGER), used.value
+        FROM production p, json_each(p.materials_used) AS used
+        WHERE p.materials_used IS NOT NULL
+    """)
+
+
+async def _order_tokens(db: aiosqlite.Connection):
+    # Sipariş formu tekrar gönderim koruması: form_token -> oluşturulan sipariş
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS order_tokens (
+            token TEXT PRIMARY KEY,
+            order_id INTEGER NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    """)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_order_tokens_created ON order_tokens(created_at)")
+
+
+async def _order_token_fingerprints(db: aiosqlite.Connection):
+    # Aynı token farklı içerikle gelirse eski sipariş döndürülmez, reddedilir
+    await _add_column(db, "order_tokens", "fingerprint", "TEXT")
+
+
+INDEXES = [
+    # Dashboard ve raporlar: tarih filtresi + ürüne/güne göre SUM (covering)
+    "CREATE INDEX IF NOT EXISTS idx_production_date_product ON production(date, product_type, quantity)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_date_product ON sales(date, product_type, quantity, total_price)",
+    # Üretim/satış listeleri: ORDER BY date DESC, created_at DESC LIMIT 20
+    "CREATE INDEX IF NOT EXISTS idx_production_date_created ON production(date, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_date_created ON sales(date, created_at)",
+    # Dashboard son işlemler: ORDER BY created_at DESC LIMIT 5
+    "CREATE INDEX IF NOT EXISTS idx_production_created ON production(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_created ON sales(created_at)",
+    # Siparişler: durum / teslimat tarihi filtreleri ve sıralaması
+    "CREATE INDEX IF NOT EXISTS idx_orders_delivery ON orders(delivery_date, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_status_delivery ON orders(status, delivery_date, created_at)",
+    # Stok hareketleri: son 20 hareket ve silme işlemlerindeki referans aramaları
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_created ON stock_movements(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_reference ON stock_movements(reference_type, reference_id)",
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_material ON stock_movements(material_id)",
+    "CREATE INDEX IF NOT EXISTS idx_product_stock_movements_created ON product_stock_movements(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_product_stock_movements_reference ON product_stock_movements(reference_type, reference_id)",
+]
+
+
+MIGRATIONS = [
+    (1, _base_schema),
+    (2, _indexes),
+    (3, _daily_rollups),
+    (4, _history_indexes),
+    (5, _orders_keyset_indexes),
+    (6, _order_items),
+    (7, _production_materials),
+    (8, _order_tokens),
+    (9, _order_token_fingerprints),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
@@ -1,12 +1,15 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Generic, Optional, TypeVar
 from datetime import date, datetime
 
+T = TypeVar("T")
+
 
 class MaterialBase(BaseModel):
     name: str
     unit: str
     price: float = 0
+    min_stock_level: float = 0
 
 
 class MaterialCreate(MaterialBase):
@@ -14,13 +17,36 @@ class MaterialCreate(MaterialBase):
 
 
 class MaterialUpdate(BaseModel):
+    """Partial update: omitted fields are left as they are."""
     name: Optional[str] = None
     unit: Optional[str] = None
     price: Optional[float] = None
+    min_stock_level: Optional[float] = None
+
+    @field_validator("name", "unit", "price", "min_stock_level", mode="before")
+    @classmethod
+    def not_null(cls, value):
+        # Kolonlar NOT NULL: açıkça gönderilen null kabul edilmez
+        if value is None:
+            raise ValueError("may not be null")
+        return value
 
 
 class Material(MaterialBase):
     id: int
+    stock_quantity: float
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ProductStock(BaseModel):
+    product_type: str
+    stock_quantity: int
+    min_stock_level: int
+    price: float
+    unit: str
     updated_at: datetime
 
     class Config:
@@ -30,8 +56,8 @@ class Material(MaterialBase):
 class ProductionBase(BaseModel):
     date: date
     product_type: str
-    quantity: int
-    materials_used: Optional[str] = None
+    quantity: int = Field(gt=0)
+    materials: dict[int, float] = {}  # material_id -> miktar
     notes: Optional[str] = None
 
 
@@ -50,7 +76,7 @@ class Production(ProductionBase):
 class SaleBase(BaseModel):
     date: date
     product_type: str
-    quantity: int
+    quantity: int = Field(gt=0)
     unit_price: float
     customer_name: Optional[str] = None
     notes: Optional[str] = None
@@ -69,6 +95,40 @@ class Sale(SaleBase):
         from_attributes = True
 
 
+class OrderItem(BaseModel):
+    product_type: str
+    quantity: int
+    unit_price: float
+    total: float
+
+
+class Order(BaseModel):
+    id: int
+    order_date: date
+    delivery_date: date
+    delivery_type: str
+    customer_name: str
+    customer_phone: str
+    address: Optional[str] = None
+    items: list[OrderItem]
+    total_amount: float
+    payment_method: str
+    status: str
+    notes: Optional[str] = None
+    created_at: datetime
+
+
+class OrderStatusUpdate(BaseModel):
+    status: str
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """One page of a list; pass ``next_cursor`` as ``before`` (``prev_cursor`` as ``after``)."""
+    data: list[T]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
 class LoginForm(BaseModel):
     username: str
     password: str
@@ -0,0 +1,204 @@
+"""Order line items, form tokens and read helpers for the admin orders page."""
+import hashlib
+import json
+import os
+import secrets
+from datetime import date, datetime, timedelta, timezone
+
+import aiosqlite
+
+from .pagination import ORDERS_ORDER, Page, keyset_page
+
+# Form token'larının saklanma süresi (saniye)
+ORDER_TOKEN_TTL = int(os.getenv("ORDER_TOKEN_TTL", "86400"))
+
+
+class TokenReused(Exception):
+    """The form token was already used for an order with different contents."""
+
+
+class OrderRow:
+    """Wraps an ``orders`` row together with its ``order_items`` rows."""
+
+    def __init__(self, row: aiosqlite.Row):
+        self._row = row
+        self.order_items: list[aiosqlite.Row] = []
+
+    def __getattr__(self, name):
+        try:
+            return self._row[name]
+        except IndexError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, name):
+        return self._row[name]
+
+
+class OrderListing:
+    """One page of the orders list, fetched when the template starts iterating it.
+
+    Lets a streamed page send its header and filters before the order
+    query runs; ``url()`` is valid after the iteration.
+    """
+
+    def __init__(self, db: aiosqlite.Connection, where: str, params: list, before, after, filters: dict):
+        self._db = db
+        self._query = (where, params, before, after)
+        self.filters = filters
+        self.page: Page | None = None
+
+    async def __aiter__(self):
+        where, params, before, after = self._query
+        self.page = await keyset_page(
+            self._db, "orders", where, params, before=before, after=after, order=ORDERS_ORDER
+        )
+        orders = [OrderRow(row) for row in self.page.rows]
+        await load_items(self._db, orders)
+        for order in orders:
+            yield order
+
+    def url(self, direction: str) -> str | None:
+        return self.page.url("/orders", self.filters, direction) if self.page else None
+
+
+async def insert_items(db: aiosqlite.Connection, order_id: int, items: list[dict]):
+    """Write the line items of a new order (inside the order's transaction)."""
+    await db.executemany(
+        """INSERT INTO order_items (order_id, product_type, quantity, unit_price, total)
+           VALUES (?, ?, ?, ?, ?)""",
+        [
+            (order_id, item["product_type"], item["quantity"], item["unit_price"], item["total"])
+            for item in items
+        ],
+    )
+
+
+def new_form_token() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def order_fingerprint(**fields) -> str:
+    """Hash of the submitted order, stored with its form token."""
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def clean_form_token(value) -> str | None:
+    """The posted token, or None if it is missing or implausible."""
+    if not isinstance(value, str) or not 16 <= len(value) <= 64:
+        return None
+    return value
+
+
+async def claim_token(db: aiosqlite.Connection, token: str | None, fingerprint: str) -> int | None:
+    """Order id already created with ``token`` (inside the write transaction).
+
+    Raises TokenReused if that order had a different ``fingerprint``.
+    """
+    if token is None:
+        return None
+    cursor = await db.execute("SELECT order_id, fingerprint FROM order_tokens WHERE token = ?", (token,))
+    row = await cursor.fetchone()
+    if row is None:
+        return None
+    # Eski kayıtlarda parmak izi yok: önceki gibi ilk sipariş döner
+    if row["fingerprint"] is not None and row["fingerprint"] != fingerprint:
+        raise TokenReused(token)
+    return row["order_id"]
+
+
+async def save_token(db: aiosqlite.Connection, token: str | None, order_id: int, fingerprint: str):
+    """Remember ``token`` for ``order_id`` and drop tokens older than ``ORDER_TOKEN_TTL``."""
+    if token is None:
+        return
+    await db.execute(
+        "INSERT INTO order_tokens (token, order_id, fingerprint) VALUES (?, ?, ?)", (token, order_id, fingerprint)
+    )
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ORDER_TOKEN_TTL)
+    await db.execute(
+        "DELETE FROM order_tokens WHERE created_at < ?", (cutoff.strftime("%Y-%m-%d %H:%M:%S"),)
+    )
+
+
+async def load_items(db: aiosqlite.Connection, orders: list[OrderRow]):
+    """Attach line items to the given orders with one indexed query."""
+    by_id = {order.id: order for order in orders}
+    if not by_id:
+        return
+    placeholders = ", ".join("?" for _ in by_id)
+    rows = await db.execute_fetchall(
+        f"""SELECT order_id, product_type, quantity, unit_price, total
+            FROM order_items
+            WHERE order_id IN ({placeholders})
+            ORDER BY order_id, id""",
+        list(by_id),
+    )
+    for row in rows:
+        by_id[row["order_id"]].order_items.append(row)
+
+
+def order_filters(status: str | None, date_filter: str):
+    """WHERE clause for the orders page filters."""
+    where = " WHERE 1=1"
+    params = []
+
+    if status:
+        where += " AND status = ?"
+        params.append(status)
+
+    if date_filter == "today":
+        where += " AND delivery_date = ?"
+        params.append(date.today().isoformat())
+    elif date_filter == "upcoming":
+        where += " AND delivery_date >= ?"
+        params.append(date.today().isoformat())
+    elif date_filter != "all":
+        # Belirli bir teslimat günü (YYYY-MM-DD)
+        try:
+            day = date.fromisoformat(date_filter)
+        except ValueError:
+            day = None
+        if day:
+            where += " AND delivery_date = ?"
+            params.append(day.isoformat())
+
+    return where, params
+
+
+async def product_demand(db: aiosqlite.Connection, delivery_date: str) -> list[aiosqlite.Row]:
+    """Quantity per product of the active orders due on ``delivery_date``."""
+    return await db.execute_fetchall(
+        """SELECT oi.product_type, SUM(oi.quantity) AS quantity, COUNT(DISTINCT o.id) AS order_count
+           FROM orders o
+           JOIN order_items oi ON oi.order_id = o.id
+           WHERE o.delivery_date = ? AND o.status = 'active'
+           GROUP BY oi.product_type
+           ORDER BY oi.product_type""",
+        (delivery_date,),
+    )
+
+
+async def order_facets(db: aiosqlite.Connection, today: str, status: str | None) -> dict:
+    """Per-status counts and per-day counts for upcoming deliveries, from one grouped query.
+
+    Past delivery dates collapse into a single NULL group, so the result
+    stays small however many orders exist.
+    """
+    rows = await db.execute_fetchall(
+        """SELECT status, CASE WHEN delivery_date >= ? THEN delivery_date END AS day, COUNT(*) AS n
+           FROM orders
+           GROUP BY status, day""",
+        (today,),
+    )
+
+    status_counts: dict[str, int] = {}
+    day_counts: dict[str, int] = {}
+    for row in rows:
+        status_counts[row["status"]] = status_counts.get(row["status"], 0) + row["n"]
+        if row["day"] is not None and (not status or row["status"] == status):
+            day_counts[row["day"]] = day_counts.get(row["day"], 0) + row["n"]
+
+    return {
+        "total": sum(status_counts.values()),
+        "status": status_counts,
+        "days": dict(sorted(day_counts.items())),
+    }
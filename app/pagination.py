@@ -0,0 +1,156 @@
+"""Keyset (cursor) pagination for the history and orders pages.
+
+A cursor is the sort key of the row at the edge of a page, so fetching
+page 500 costs the same index seek as page 1, unlike ``OFFSET``. The
+sort order is a tuple of ``(column, descending)`` pairs that must end in
+a unique column.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+import aiosqlite
+
+PAGE_SIZE = 20
+
+# Üretim/satış geçmişi: en yeni kayıt önce
+HISTORY_ORDER = (("date", True), ("created_at", True), ("id", True))
+
+# Siparişler: en yakın teslimat önce, aynı gün içinde en yeni sipariş önce
+ORDERS_ORDER = (("delivery_date", False), ("id", True))
+
+
+def encode_cursor(row, order=HISTORY_ORDER) -> str:
+    key = [row[column] for column, _ in order]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(value: str | None, order=HISTORY_ORDER) -> tuple | None:
+    """Return the key stored in ``value``, or None if it is missing or malformed."""
+    if not value:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+    except (ValueError, RecursionError):
+        return None
+    if not isinstance(key, list) or len(key) != len(order):
+        return None
+    # Elle hazırlanmış imleçler: yalnızca SQLite'a bağlanabilen skaler değerler
+    if not all(_is_key_value(value) for value in key):
+        return None
+    return tuple(key)
+
+
+def _is_key_value(value) -> bool:
+    if isinstance(value, int):
+        return -2**63 <= value < 2**63
+    return value is None or isinstance(value, (str, float))
+
+
+def _seek(order, key) -> tuple[str, list]:
+    """SQL condition selecting rows that sort strictly after ``key``."""
+    directions = {descending for _, descending in order}
+    if len(directions) == 1:
+        # Tek yönlü sıralama: satır değeri karşılaştırması indeksle aranır
+        columns = ", ".join(column for column, _ in order)
+        placeholders = ", ".join("?" for _ in order)
+        op = "<" if order[0][1] else ">"
+        return f"({columns}) {op} ({placeholders})", list(key)
+
+    (column, descending), rest = order[0], order[1:]
+    op = "<" if descending else ">"
+    if not rest:
+        return f"{column} {op} ?", [key[0]]
+    inner, params = _seek(rest, key[1:])
+    return f"{column} {op}= ? AND ({column} {op} ? OR ({inner}))", [key[0], key[0], *params]
+
+
+def _order_by(order) -> str:
+    return ", ".join(f"{column} {'DESC' if descending else 'ASC'}" for column, descending in order)
+
+
+def history_filters(start_date: str | None, end_date: str | None, product_type: str | None):
+    """WHERE clause for production/sales history filters."""
+    where = " WHERE 1=1"
+    params = []
+    if start_date:
+        where += " AND date >= ?"
+        params.append(start_date)
+    if end_date:
+        where += " AND date <= ?"
+        params.append(end_date)
+    if product_type:
+        where += " AND product_type = ?"
+        params.append(product_type)
+    return where, params
+
+
+@dataclass
+class Page:
+    rows: list
+    prev_cursor: str | None = None
+    next_cursor: str | None = None
+
+    def url(self, path: str, filters: dict, direction: str) -> str | None:
+        """Link to the previous ("after") or next ("before") page, keeping the filters."""
+        cursor = self.prev_cursor if direction == "after" else self.next_cursor
+        if cursor is None:
+            return None
+        params = {k: v for k, v in filters.items() if v}
+        params[direction] = cursor
+        return f"{path}?{urlencode(params)}"
+
+
+async def keyset_page(
+    db: aiosqlite.Connection,
+    table: str,
+    where: str,
+    params: list,
+    before: str | None = None,
+    after: str | None = None,
+    limit: int = PAGE_SIZE,
+    order=HISTORY_ORDER,
+    columns: str = "*",
+) -> Page:
+    """Fetch one page of ``table`` in ``order`` around the given cursor.
+
+    ``where`` must start with `` WHERE`` (see ``history_filters``).
+    ``before`` moves forward through the order (older rows for history
+    pages), ``after`` moves back.
+    """
+    before_key = decode_cursor(before, order)
+    after_key = decode_cursor(after, order) if before_key is None else None
+    reverse = tuple((column, not descending) for column, descending in order)
+
+    query = f"SELECT {columns} FROM {table}{where}"
+    params = list(params)
+    if after_key is not None:
+        condition, seek_params = _seek(reverse, after_key)
+        query += f" AND {condition} ORDER BY {_order_by(reverse)}"
+        params.extend(seek_params)
+    else:
+        if before_key is not None:
+            condition, seek_params = _seek(order, before_key)
+            query += f" AND {condition}"
+            params.extend(seek_params)
+        query += f" ORDER BY {_order_by(order)}"
+    query += " LIMIT ?"
+    params.append(limit + 1)
+
+    rows = await db.execute_fetchall(query, params)
+    has_more = len(rows) > limit
+    rows = list(rows[:limit])
+
+    if after_key is not None:
+        rows.reverse()
+        return Page(
+            rows,
+            prev_cursor=encode_cursor(rows[0], order) if has_more else None,
+            next_cursor=encode_cursor(rows[-1], order) if rows else after,
+        )
+
+    page = Page(rows, next_cursor=encode_cursor(rows[-1], order) if has_more else None)
+    if before_key is not None:
+        page.prev_cursor = encode_cursor(rows[0], order) if rows else before
+    return page
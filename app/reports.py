@@ -0,0 +1,129 @@
+"""Report data for a date range, fetched with a single query.
+
+``fetch_report`` returns a ``Report`` whose keys and row shapes are what
+``reports.html`` expects; keep the two in sync.
+"""
+from datetime import date, timedelta
+from typing import TypedDict
+
+import aiosqlite
+
+
+class ProductionSummaryRow(TypedDict):
+    product_type: str
+    total: int
+
+
+class SalesSummaryRow(TypedDict):
+    product_type: str
+    total_qty: int
+    total_revenue: float
+
+
+class DailyProductionRow(TypedDict):
+    date: str
+    production_qty: int
+
+
+class DailySalesRow(TypedDict):
+    date: str
+    sales_qty: int
+    revenue: float
+
+
+class MaterialUsageRow(TypedDict):
+    name: str
+    amount: float
+    unit: str
+
+
+class Report(TypedDict):
+    production_summary: list[ProductionSummaryRow]  # ürüne göre, product_type artan
+    sales_summary: list[SalesSummaryRow]            # ürüne göre, product_type artan
+    total_revenue: float
+    daily_production: list[DailyProductionRow]      # güne göre, tarih azalan
+    daily_sales: list[DailySalesRow]                # güne göre, tarih azalan
+    material_usage: list[MaterialUsageRow]          # malzemeye göre, ad artan
+
+
+# Her tablo bir kez taranır (MATERIALIZED), beş özet tek sonuç kümesinde döner
+REPORT_QUERY = """
+    WITH p AS MATERIALIZED (
+        SELECT date, product_type, quantity
+        FROM daily_production
+        WHERE date BETWEEN :start AND :end
+    ),
+    s AS MATERIALIZED (
+        SELECT date, product_type, quantity, revenue
+        FROM daily_sales
+        WHERE date BETWEEN :start AND :end
+    )
+    SELECT 'production' AS section, product_type AS key, SUM(quantity) AS qty, NULL AS revenue, NULL AS unit
+    FROM p GROUP BY product_type
+    UNION ALL
+    SELECT 'sales', product_type, SUM(quantity), SUM(revenue), NULL
+    FROM s GROUP BY product_type
+    UNION ALL
+    SELECT 'daily_production', date, SUM(quantity), NULL, NULL
+    FROM p GROUP BY date
+    UNION ALL
+    SELECT 'daily_sales', date, SUM(quantity), SUM(revenue), NULL
+    FROM s GROUP BY date
+    UNION ALL
+    SELECT 'materials', m.name, SUM(pm.amount), NULL, m.unit
+    FROM production pr
+    JOIN production_materials pm ON pm.production_id = pr.id
+    JOIN materials m ON m.id = pm.material_id
+    WHERE pr.date BETWEEN :start AND :end
+    GROUP BY pm.material_id
+    ORDER BY section, key
+"""
+
+
+async def fetch_report(db: aiosqlite.Connection, start: date, end: date) -> Report:
+    rows = await db.execute_fetchall(REPORT_QUERY, {"start": start.isoformat(), "end": end.isoformat()})
+
+    report: Report = {
+        "production_summary": [],
+        "sales_summary": [],
+        "total_revenue": 0,
+        "daily_production": [],
+        "daily_sales": [],
+        "material_usage": [],
+    }
+    for section, key, qty, revenue, unit in rows:
+        if section == "production":
+            report["production_summary"].append({"product_type": key, "total": qty})
+        elif section == "sales":
+            report["sales_summary"].append({"product_type": key, "total_qty": qty, "total_revenue": revenue})
+            report["total_revenue"] += revenue
+        elif section == "daily_production":
+            report["daily_production"].append({"date": key, "production_qty": qty})
+        elif section == "materials":
+            report["material_usage"].append({"name": key, "amount": qty, "unit": unit})
+        else:
+            report["daily_sales"].append({"date": key, "sales_qty": qty, "revenue": revenue})
+
+    report["daily_production"].reverse()
+    report["daily_sales"].reverse()
+    return report
+
+
+def report_range(period: str, start_date: str | None, end_date: str | None) -> tuple[date, date]:
+    today = date.today()
+
+    if period == "today":
+        start = end = today
+    elif period == "week":
+        start = today - timedelta(days=today.weekday())
+        end = today
+    elif period == "month":
+        start = today.replace(day=1)
+        end = today
+    elif period == "custom" and start_date and end_date:
+        start = date.fromisoformat(start_date)
+        end = date.fromisoformat(end_date)
+    else:
+        start = end = today
+
+    return start, end
@@ -0,0 +1,120 @@
+"""Daily production and sales rollups.
+
+``daily_production`` and ``daily_sales`` hold one row per (date,
+product_type) and are updated inside the same write transaction as the
+raw ``production`` / ``sales`` rows, so reports and the dashboard read a
+handful of rows instead of scanning every record.
+
+Rebuild them from the raw tables with::
+
+    python -m app.rollups rebuild
+"""
+import asyncio
+import sys
+
+import aiosqlite
+
+
+async def create_tables(db: aiosqlite.Connection):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS daily_production (
+            date DATE NOT NULL,
+            product_type TEXT NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            entry_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, product_type)
+        ) WITHOUT ROWID
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            date DATE NOT NULL,
+            product_type TEXT NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            sale_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, product_type)
+        ) WITHOUT ROWID
+    """)
+
+
+async def add_production(db: aiosqlite.Connection, day: str, product_type: str, quantity: int):
+    await db.execute(
+        """INSERT INTO daily_production (date, product_type, quantity, entry_count)
+           VALUES (?, ?, ?, 1)
+           ON CONFLICT (date, product_type) DO UPDATE SET
+               quantity = quantity + excluded.quantity,
+               entry_count = entry_count + 1""",
+        (day, product_type, quantity),
+    )
+
+
+async def remove_production(db: aiosqlite.Connection, day: str, product_type: str, quantity: int):
+    await db.execute(
+        """UPDATE daily_production SET quantity = quantity - ?, entry_count = entry_count - 1
+           WHERE date = ? AND product_type = ?""",
+        (quantity, day, product_type),
+    )
+    await db.execute(
+        "DELETE FROM daily_production WHERE date = ? AND product_type = ? AND entry_count <= 0",
+        (day, product_type),
+    )
+
+
+async def add_sale(db: aiosqlite.Connection, day: str, product_type: str, quantity: int, revenue: float):
+    await db.execute(
+        """INSERT INTO daily_sales (date, product_type, quantity, revenue, sale_count)
+           VALUES (?, ?, ?, ?, 1)
+           ON CONFLICT (date, product_type) DO UPDATE SET
+               quantity = quantity + excluded.quantity,
+               revenue = revenue + excluded.revenue,
+               sale_count = sale_count + 1""",
+        (day, product_type, quantity, revenue),
+    )
+
+
+async def remove_sale(db: aiosqlite.Connection, day: str, product_type: str, quantity: int, revenue: float):
+    await db.execute(
+        """UPDATE daily_sales SET quantity = quantity - ?, revenue = revenue - ?, sale_count = sale_count - 1
+           WHERE date = ? AND product_type = ?""",
+        (quantity, revenue, day, product_type),
+    )
+    await db.execute(
+        "DELETE FROM daily_sales WHERE date = ? AND product_type = ? AND sale_count <= 0",
+        (day, product_type),
+    )
+
+
+async def rebuild(db: aiosqlite.Connection):
+    """Regenerate both rollup tables from the raw rows (caller commits)."""
+    await db.execute("DELETE FROM daily_production")
+    await db.execute("""
+        INSERT INTO daily_production (date, product_type, quantity, entry_count)
+        SELECT date, product_type, SUM(quantity), COUNT(*)
+        FROM production
+        GROUP BY date, product_type
+    """)
+    await db.execute("DELETE FROM daily_sales")
+    await db.execute("""
+        INSERT INTO daily_sales (date, product_type, quantity, revenue, sale_count)
+        SELECT date, product_type, SUM(quantity), SUM(total_price), COUNT(*)
+        FROM sales
+        GROUP BY date, product_type
+    """)
+
+
+async def _rebuild_database():
+    from .database import DATABASE_PATH, init_db
+
+    await init_db()
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        await db.execute("PRAGMA busy_timeout = 5000")
+        await db.execute("BEGIN IMMEDIATE")
+        await rebuild(db)
+        await db.commit()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m app.rollups rebuild")
+    asyncio.run(_rebuild_database())
+    print("Rollup tabloları yeniden oluşturuldu.")
@@ -0,0 +1,86 @@
+// Fragment forms: submit with fetch and swap in the returned HTML instead of reloading the page.
+//
+//   <form method="post" action="/sales" data-fragment
+//         data-target="#sales-rows" data-swap="afterbegin" data-reset>
+//
+// data-target  CSS selector, or "closest <selector>" (default: the form itself)
+// data-swap    outerHTML (default) | innerHTML | afterbegin | beforeend | none
+// data-reset   clear the form after a successful swap
+//
+// The request carries "HX-Request: true" and the page URL ("HX-Current-URL",
+// so the server can tell whether a new row belongs on the filtered list); the
+// server answers with only the changed markup, or redirects to reload the page. Elements in the response with hx-swap-oob="true" replace the
+// element with the same id; hx-swap-oob="afterbegin:#id" prepends their children
+// to #id. Table rows for another table are sent as <template hx-swap-oob="...">,
+// since a <tbody> outside a table is dropped by the parser. If a target is
+// missing the form falls back to a normal submit.
+(function () {
+    function resolve(form, selector) {
+        if (!selector) return form;
+        if (selector.startsWith('closest ')) return form.closest(selector.slice(8));
+        return document.querySelector(selector);
+    }
+
+    function swap(target, mode, nodes) {
+        if (mode === 'outerHTML') target.replaceWith(...nodes);
+        else if (mode === 'innerHTML') target.replaceChildren(...nodes);
+        else if (mode === 'afterbegin') target.prepend(...nodes);
+        else if (mode === 'beforeend') target.append(...nodes);
+    }
+
+    function swapOutOfBand(fragment) {
+        fragment.querySelectorAll('[hx-swap-oob]').forEach(function (element) {
+            const spec = element.getAttribute('hx-swap-oob');
+            element.remove();
+            element.removeAttribute('hx-swap-oob');
+            if (spec === 'true') {
+                const target = document.getElementById(element.id);
+                if (target) target.replaceWith(element);
+                return;
+            }
+            const [mode, selector] = spec.split(':');
+            const target = document.querySelector(selector);
+            const source = element instanceof HTMLTemplateElement ? element.content : element;
+            if (target) swap(target, mode, Array.from(source.childNodes));
+        });
+    }
+
+    document.addEventListener('submit', async function (event) {
+        const form = event.target;
+        if (!form.hasAttribute('data-fragment') || event.defaultPrevented) return;
+
+        const mode = form.dataset.swap || 'outerHTML';
+        const target = resolve(form, form.dataset.target);
+        if (mode !== 'none' && !target) return;  // fall back to a normal submit
+        event.preventDefault();
+
+        const buttons = form.querySelectorAll('button[type="submit"]');
+        buttons.forEach(button => button.disabled = true);
+        try {
+            const response = await fetch(form.action, {
+                method: 'POST',
+                body: new FormData(form),
+                headers: { 'HX-Request': 'true', 'HX-Current-URL': window.location.href },
+                credentials: 'same-origin',
+            });
+            if (response.redirected || !response.ok) {
+                if (response.status >= 400 && response.status < 500) {
+                    alert(await response.text());
+                } else {
+                    window.location.reload();
+                }
+                return;
+            }
+
+            const template = document.createElement('template');
+            template.innerHTML = await response.text();
+            swapOutOfBand(template.content);
+            if (mode !== 'none') swap(target, mode, Array.from(template.content.childNodes));
+            if (form.hasAttribute('data-reset') && form.isConnected) form.reset();
+        } catch (error) {
+            window.location.reload();
+        } finally {
+            buttons.forEach(button => button.disabled = false);
+        }
+    });
+})();
@@ -0,0 +1,183 @@
+"""Jinja environments: bytecode cache, precompilation, fragment caching and streaming.
+
+Compiled templates are written to ``TEMPLATE_CACHE_DIR`` (filled at image
+build time by ``python -m app.templating``), so a fresh process loads
+bytecode instead of parsing every template on its first hit.
+
+``{% cache "name", key1, key2 %}...{% endcache %}`` stores the rendered
+block under the template name and the given keys; use it for parts that
+depend only on values such as ``catalog_version`` or the request path.
+Blocks whose keys are missing or None are rendered normally.
+
+POST handlers answer fragment requests (``wants_fragment``) with only the
+changed markup from ``templates/partials/`` instead of redirecting back
+to the page, which would re-run every query of that page.
+
+``stream_template`` renders with an async overlay of the environment and
+sends the page as it is produced, so the head and filters reach the
+browser while rows are still being read from async iterators.
+"""
+import hashlib
+import inspect
+import os
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import anyio
+from fastapi.responses import StreamingResponse
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from jinja2.runtime import Undefined
+
+from . import compression
+from .compression import HTMLMinifier
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+TEMPLATE_CACHE_DIR = Path(os.getenv("TEMPLATE_CACHE_DIR", Path(__file__).parent.parent / ".jinja_cache"))
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "1") == "1"
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "256"))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "4096"))
+
+
+class FragmentCache:
+    """Bounded LRU of rendered template fragments."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: OrderedDict[tuple, str] = OrderedDict()
+
+    def get(self, key: tuple) -> str | None:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: tuple, value: str):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+fragment_cache = FragmentCache(FRAGMENT_CACHE_SIZE)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        key = nodes.List([nodes.Const(parser.name), *args])
+        return nodes.CallBlock(
+            self.call_method("_render", [key]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        key = tuple(key)
+        if any(part is None or isinstance(part, Undefined) for part in key):
+            return caller()
+        cached = fragment_cache.get(key)
+        if cached is not None:
+            return cached
+        rendered = caller()
+        if inspect.isawaitable(rendered):
+            # Async ortamda caller() bir coroutine döner
+            async def store():
+                value = await rendered
+                fragment_cache.set(key, value)
+                return value
+
+            return store()
+        fragment_cache.set(key, rendered)
+        return rendered
+
+
+def _bytecode_cache(kind: str = "sync") -> FileSystemBytecodeCache:
+    TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Ön işleme (minify) kodu değişince eski bytecode kullanılmasın
+    digest = hashlib.sha1(
+        Path(compression.__file__).read_bytes() + Path(__file__).read_bytes()
+    ).hexdigest()[:8]
+    # Sync ve async derlemeler farklı kod üretir, aynı dosyayı paylaşmamalı
+    return FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR), f"__jinja2_{digest}_{kind}_%s.cache")
+
+
+def wants_fragment(request) -> bool:
+    """True for requests sent by ``static/fragments.js`` (``HX-Request`` header)."""
+    return request.headers.get("hx-request") == "true"
+
+
+def fragment_view(request) -> tuple[str, dict]:
+    """Query string and parameters of the page a fragment form was sent from (``HX-Current-URL``)."""
+    query = urlsplit(request.headers.get("hx-current-url", "")).query
+    return query, dict(parse_qsl(query))
+
+
+def create_templates(directory=TEMPLATE_DIR) -> Jinja2Templates:
+    return Jinja2Templates(
+        directory=directory,
+        extensions=[HTMLMinifier, FragmentCacheExtension],
+        bytecode_cache=_bytecode_cache(),
+        auto_reload=TEMPLATE_AUTO_RELOAD,
+    )
+
+
+def create_stream_env(templates: Jinja2Templates) -> Environment:
+    """Async overlay of ``templates.env``; filters and globals are shared."""
+    return templates.env.overlay(enable_async=True, bytecode_cache=_bytecode_cache("async"))
+
+
+def precompile(*environments: Environment) -> int:
+    """Load every template once so the first request does not pay for parsing."""
+    names = environments[0].list_templates(extensions=["html"])
+    for env in environments:
+        for name in names:
+            env.get_template(name)
+    return len(names)
+
+
+async def _generate(template, context: dict, on_close):
+    buffer: list[str] = []
+    size = 0
+    try:
+        async for chunk in template.generate_async(context):
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer.clear()
+                size = 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        # İstemci koparsa da satır iteratörleri kapanır, bağlantı havuza döner
+        with anyio.CancelScope(shield=True):
+            for value in context.values():
+                if inspect.isasyncgen(value):
+                    await value.aclose()
+            if on_close is not None:
+                await on_close()
+
+
+def stream_template(env: Environment, name: str, context: dict, on_close=None) -> StreamingResponse:
+    """Render ``name`` incrementally; ``on_close`` runs once the page is sent (or abandoned)."""
+    return StreamingResponse(
+        _generate(env.get_template(name), context, on_close),
+        media_type="text/html",
+    )
+
+
+if __name__ == "__main__":
+    # Docker imajı oluşturulurken bytecode önbelleğini doldurur (filtreler main'de kayıtlı)
+    from .main import templates, stream_env
+
+    print(f"{precompile(templates.env, stream_env)} templates compiled into {TEMPLATE_CACHE_DIR}")
@@ -0,0 +1,212 @@
+"""Write transactions shared by the HTML form handlers and the JSON API.
+
+Each function runs inside the writer's transaction: call it through
+``run_write(lambda db: record_sale(db, ...))`` and then ``notify_change``
+with the tables it touched.
+"""
+import aiosqlite
+
+from . import rollups
+from .database import PRODUCT_TYPES
+from .orders import OrderRow, load_items
+
+# Malzeme güncellemede değiştirilebilen kolonlar
+MATERIAL_COLUMNS = ("name", "unit", "price", "min_stock_level")
+
+
+async def record_production(
+    db: aiosqlite.Connection,
+    production_date: str,
+    product_type: str,
+    quantity: int,
+    materials_used: dict[int, float],
+    notes: str | None = None,
+) -> aiosqlite.Row:
+    """Insert a production run, take its materials from stock and add the product to stock."""
+    # Üretim kaydı ekle
+    [production] = await db.execute_fetchall(
+        """INSERT INTO production (date, product_type, quantity, notes)
+           VALUES (?, ?, ?, ?) RETURNING *""",
+        (production_date, product_type, quantity, notes or None),
+    )
+    production_id = production["id"]
+
+    if materials_used:
+        await db.executemany(
+            "INSERT INTO production_materials (production_id, material_id, amount) VALUES (?, ?, ?)",
+            [(production_id, material_id, amount) for material_id, amount in materials_used.items()],
+        )
+
+        # Hammadde stoktan düş
+        await db.execute(
+            """UPDATE materials SET stock_quantity = stock_quantity - pm.amount, updated_at = CURRENT_TIMESTAMP
+               FROM production_materials pm
+               WHERE pm.production_id = ? AND materials.id = pm.material_id""",
+            (production_id,),
+        )
+        await db.execute(
+            """INSERT INTO stock_movements (material_id, movement_type, quantity, reference_type, reference_id, notes)
+               SELECT material_id, 'production', -amount, 'production', production_id, ?
+               FROM production_materials WHERE production_id = ?""",
+            (f"{PRODUCT_TYPES.get(product_type, product_type)} üretimi", production_id),
+        )
+
+    # Ürün stoğuna ekle
+    await db.execute(
+        "UPDATE product_stock SET stock_quantity = stock_quantity + ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ?",
+        (quantity, product_type),
+    )
+    await db.execute(
+        """INSERT INTO product_stock_movements (product_type, movement_type, quantity, reference_type, reference_id, notes)
+           VALUES (?, 'production', ?, 'production', ?, ?)""",
+        (product_type, quantity, production_id, "Üretim"),
+    )
+
+    await rollups.add_production(db, production_date, product_type, quantity)
+    return production
+
+
+async def delete_production(db: aiosqlite.Connection, production_id: int):
+    """Delete a production run and undo its stock changes."""
+    # Üretim kaydını al
+    cursor = await db.execute("SELECT date, product_type, quantity FROM production WHERE id = ?", (production_id,))
+    row = await cursor.fetchone()
+
+    if row:
+        # Hammadde stoklarını geri ekle
+        await db.execute(
+            """UPDATE materials SET stock_quantity = stock_quantity + pm.amount, updated_at = CURRENT_TIMESTAMP
+               FROM production_materials pm
+               WHERE pm.production_id = ? AND materials.id = pm.material_id""",
+            (production_id,),
+        )
+
+        # Ürün stoğundan düş
+        await db.execute(
+            "UPDATE product_stock SET stock_quantity = stock_quantity - ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ?",
+            (row["quantity"], row["product_type"]),
+        )
+
+        await rollups.remove_production(db, row["date"], row["product_type"], row["quantity"])
+
+    # Stok hareketlerini sil
+    await db.execute("DELETE FROM stock_movements WHERE reference_type = 'production' AND reference_id = ?", (production_id,))
+    await db.execute("DELETE FROM product_stock_movements WHERE reference_type = 'production' AND reference_id = ?", (production_id,))
+
+    # Üretim kaydını sil
+    await db.execute("DELETE FROM production_materials WHERE production_id = ?", (production_id,))
+    await db.execute("DELETE FROM production WHERE id = ?", (production_id,))
+
+
+async def record_sale(
+    db: aiosqlite.Connection,
+    sale_date: str,
+    product_type: str,
+    quantity: int,
+    unit_price: float,
+    customer_name: str | None = None,
+    notes: str | None = None,
+) -> aiosqlite.Row:
+    """Insert a sale and take the product from stock."""
+    total_price = quantity * unit_price
+
+    # Satış kaydı ekle
+    [sale] = await db.execute_fetchall(
+        """INSERT INTO sales (date, product_type, quantity, unit_price, total_price, customer_name, notes)
+           VALUES (?, ?, ?, ?, ?, ?, ?) RETURNING *""",
+        (sale_date, product_type, quantity, unit_price, total_price, customer_name or None, notes or None),
+    )
+    sale_id = sale["id"]
+
+    # Ürün stoğundan düş
+    await db.execute(
+        "UPDATE product_stock SET stock_quantity = stock_quantity - ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ?",
+        (quantity, product_type),
+    )
+    await db.execute(
+        """INSERT INTO product_stock_movements (product_type, movement_type, quantity, reference_type, reference_id, notes)
+           VALUES (?, 'sale', ?, 'sale', ?, ?)""",
+        (product_type, -quantity, sale_id, customer_name or "Satış"),
+    )
+
+    await rollups.add_sale(db, sale_date, product_type, quantity, total_price)
+    return sale
+
+
+async def delete_sale(db: aiosqlite.Connection, sale_id: int):
+    """Delete a sale and put the product back in stock."""
+    # Satış kaydını al
+    cursor = await db.execute("SELECT date, product_type, quantity, total_price FROM sales WHERE id = ?", (sale_id,))
+    row = await cursor.fetchone()
+
+    if row:
+        # Ürün stoğuna geri ekle
+        await db.execute(
+            "UPDATE product_stock SET stock_quantity = stock_quantity + ?, updated_at = CURRENT_TIMESTAMP WHERE product_type = ?",
+            (row["quantity"], row["product_type"]),
+        )
+
+        await rollups.remove_sale(db, row["date"], row["product_type"], row["quantity"], row["total_price"])
+
+    # Stok hareketini sil
+    await db.execute("DELETE FROM product_stock_movements WHERE reference_type = 'sale' AND reference_id = ?", (sale_id,))
+
+    # Satış kaydını sil
+    await db.execute("DELETE FROM sales WHERE id = ?", (sale_id,))
+
+
+async def save_material(
+    db: aiosqlite.Connection,
+    name: str,
+    unit: str,
+    price: float = 0,
+    min_stock_level: float = 0,
+    replace: bool = True,
+) -> aiosqlite.Row:
+    """Insert a material with an empty stock.
+
+    With ``replace`` an existing material of the same name is replaced,
+    otherwise the insert fails with an IntegrityError.
+    """
+    verb = "INSERT OR REPLACE" if replace else "INSERT"
+    [material] = await db.execute_fetchall(
+        f"""{verb} INTO materials (name, unit, price, stock_quantity, min_stock_level, updated_at)
+           VALUES (?, ?, ?, 0, ?, CURRENT_TIMESTAMP) RETURNING *""",
+        (name, unit, price, min_stock_level),
+    )
+    return material
+
+
+async def update_material(db: aiosqlite.Connection, material_id: int, **values) -> aiosqlite.Row | None:
+    """Set the given ``MATERIAL_COLUMNS``; return the updated row, or None if it does not exist."""
+    columns = [column for column in MATERIAL_COLUMNS if column in values]
+    assignments = "".join(f"{column} = ?, " for column in columns)
+    rows = await db.execute_fetchall(
+        f"UPDATE materials SET {assignments}updated_at = CURRENT_TIMESTAMP WHERE id = ? RETURNING *",
+        [*(values[column] for column in columns), material_id],
+    )
+    return rows[0] if rows else None
+
+
+async def delete_material(db: aiosqlite.Connection, material_id: int):
+    """Delete a material together with its stock movements."""
+    await db.execute("DELETE FROM stock_movements WHERE material_id = ?", (material_id,))
+    await db.execute("DELETE FROM materials WHERE id = ?", (material_id,))
+
+
+async def set_order_status(db: aiosqlite.Connection, order_id: int, status: str) -> OrderRow | None:
+    """Change an order's status; return it with its items, or None if it does not exist."""
+    orders = [
+        OrderRow(row) for row in await db.execute_fetchall(
+            "UPDATE orders SET status = ? WHERE id = ? RETURNING *",
+            (status, order_id),
+        )
+    ]
+    await load_items(db, orders)
+    return orders[0] if orders else None
+
+
+async def delete_order(db: aiosqlite.Connection, order_id: int):
+    """Delete an order and its line items."""
+    await db.execute("DELETE FROM order_items WHERE order_id = ?", (order_id,))
+    await db.execute("DELETE FROM orders WHERE id = ?", (order_id,))